@@ -844,7 +844,7 @@ class MainActivity : AppCompatActivity() {
                     val messageAccountType = json.get("account_type")?.asString
 
                     when (type) {
-                        "price_update", "account_status" -> {
+                        "price_update", "price_updates", "account_status" -> {
                             if (messageAccountType == currentAccount) {
                                 val account = json.getAsJsonObject("account_metrics")
                                 if (account != null) {
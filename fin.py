@@ -6,47 +6,86 @@ load_dotenv()
 
 # Import required libraries
 try:
-    from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, status, File, UploadFile
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, status, File, UploadFile, Query
     from fastapi.middleware.cors import CORSMiddleware
     from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials
-    from fastapi.responses import HTMLResponse
+    from fastapi.responses import HTMLResponse, StreamingResponse
     from fastapi.staticfiles import StaticFiles
     from jose import JWTError, jwt
     import hashlib
+    import hmac
     from datetime import datetime, timedelta, timezone
-    from typing import List, Dict, Optional
-    from pydantic import BaseModel, Field, validator, root_validator
+    from typing import List, Dict, Optional, Set, Iterable, Tuple
+    from pydantic import BaseModel, ConfigDict, Field, field_validator
     from enum import Enum
     import asyncio
     import json
+    import orjson
     import uuid
     import random
+    import time
+    import operator
     import numpy as np
-    from sqlalchemy import create_engine, Column, String, Float, DateTime, Enum as SQLAlchemyEnum, text, LargeBinary
+    from sqlalchemy import create_engine, event, Column, String, Float, DateTime, Enum as SQLAlchemyEnum, text, LargeBinary, Index, func, case, select, update, delete
     from sqlalchemy.orm import declarative_base, sessionmaker, Session
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
     from sqlalchemy.exc import IntegrityError
     from contextlib import asynccontextmanager
     import pytz
     import logging
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
     import base64
+    import webbrowser
 except ImportError as e:
     print(f"Missing required library: {e}")
     print("Please install required packages with: pip install -r requirements.txt")
     exit(1)
 
+# Log records are queued and written by a listener thread, so the event loop never blocks on stdout
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+log_listener = QueueListener(log_queue, log_stream_handler)
+log_listener.start()
+
+logger = logging.getLogger("mt5_simulator")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.addHandler(QueueHandler(log_queue))
+logger.propagate = False
+
+# Set by the __main__ launcher for local runs; tests and hosted deployments never open a browser
+OPEN_DASHBOARD_ON_STARTUP = False
+
+def open_dashboard():
+    html_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend.html")
+    if os.path.exists(html_file):
+        logger.info("Opening dashboard: %s", html_file)
+        webbrowser.open(f"file:///{html_file}")
+    else:
+        logger.warning("Dashboard file not found: %s", html_file)
+
+@asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup - create background tasks for all accounts
-    for account_type in ACCOUNT_TYPES:
-        asyncio.create_task(account_simulate_trades(account_type))
+    # Stagger the account ticks across the interval so their broadcasts don't pile up
+    for index, account_type in enumerate(ACCOUNT_TYPES):
+        # Created here so the event binds to the running loop
+        trades_dirty[account_type] = asyncio.Event()
+        asyncio.create_task(account_simulate_trades(account_type, start_offset=index * SIMULATION_TICK_SECONDS / len(ACCOUNT_TYPES)))
         asyncio.create_task(auto_save_trades_to_database(account_type))
     
     # Load balances from file if available
     load_account_balances()    
 
-    print("Background tasks started: Trade simulation and auto-save (every 30s)")
+    logger.info("Background tasks started: Trade simulation and auto-save (at most every %gs)", AUTO_SAVE_SECONDS)
+    if OPEN_DASHBOARD_ON_STARTUP:
+        # Once startup has finished rather than after a fixed delay; off the loop since it may spawn a process
+        asyncio.get_running_loop().run_in_executor(None, open_dashboard)
     yield
-    # Shutdown (if needed)
-    pass
+    # Shutdown - let SQLite refresh planner statistics for the new indexes
+    optimize_account_databases()
+    log_listener.stop()
 
 app = FastAPI(title="MetaTrader 5 Simulator API - Multi-Account Edition", lifespan=lifespan)
 
@@ -99,12 +138,25 @@ security = HTTPBearer(auto_error=False)
 
 # Constants
 CURRENCY_PAIRS = ["EURUSD", "GBPUSD", "USDJPY", "USDCNH", "USDRUB", "AUDUSD", "NZDUSD", "USDSEK", "XAUUSD", "XAUAUD", "USDCAD"]
+# USD-base pairs quote P&L in the base currency, so price differences are divided by the price
+USD_BASE_SYMBOLS = frozenset(symbol for symbol in CURRENCY_PAIRS if symbol.startswith("USD"))
 DEFAULT_ACCOUNT_BALANCE = 10000.0
 DEFAULT_LEVERAGE = 500
+CONTRACT_SIZE = 100000  # Standard MT5 contract size
 SWAP_RATE_BUY = -0.0001
 SWAP_RATE_SELL = 0.00005
 COMMISSION = 0.0001
 ACCOUNT_TYPES = ["Fast/Acc", "Demo/Acc", "Hunter/Acc", "LivePro/Acc"]
+SIMULATION_TICK_SECONDS = 1.0
+AUTO_SAVE_SECONDS = 30.0
+# Random trade ids generated per start_trade, checked for collisions in one query
+TRADE_ID_CANDIDATES = 32
+# Trades per IN (...) lookup and per executemany UPDATE in bulk-update
+BULK_UPDATE_CHUNK = 500
+# Longest a broadcast waits on one websocket client before dropping it
+WS_SEND_TIMEOUT_SECONDS = 5.0
+# Window over which endpoint events (deposits, trade edits and deletions) share one websocket frame
+EVENT_BATCH_SECONDS = 0.02
 
 # Stable account identifiers (9 digits) for external identification
 ACCOUNT_ID_MAP: Dict[str, str] = {
@@ -124,13 +176,18 @@ session_state = {
 
 # Global timezone setting - default to UTC
 SYSTEM_TIMEZONE = "UTC"
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Resolved tzinfo and timestamp format for SYSTEM_TIMEZONE; always reassigned together with it
+SYSTEM_TZ = pytz.timezone(SYSTEM_TIMEZONE)
+SYSTEM_TIMESTAMP_FORMAT = f"{DATETIME_FORMAT} {SYSTEM_TIMEZONE}"
 
 # Password hashing
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hash_password(plain_password) == hashed_password
+    # Constant-time compare so response timing doesn't leak how much of the hash matched
+    return hmac.compare_digest(hash_password(plain_password), hashed_password)
 
 ADMIN_PASSWORD_HASH = hash_password("secret")
 
@@ -192,9 +249,10 @@ class CurrencyPairConfig(BaseModel):
     sell_enabled: bool = Field(True, description="Whether selling is enabled")
     mean_reversion_strength: float = Field(0.05, gt=0, le=1, description="Strength of mean reversion for price simulation")
 
-    @validator('sell_starting_price')
-    def sell_price_must_be_greater_than_buy(v, values):
-        if 'buy_starting_price' in values and v <= values['buy_starting_price']:
+    @field_validator('sell_starting_price')
+    @classmethod
+    def sell_price_must_be_greater_than_buy(cls, v, info):
+        if 'buy_starting_price' in info.data and v <= info.data['buy_starting_price']:
             raise ValueError('Sell price must be greater than buy price')
         return v
 
@@ -209,6 +267,21 @@ class AccountMetrics(BaseModel):
     total_profit_loss: float = 0.0
     deposit: float = 0.0
 
+def compute_pnl(current_price, entry_price, lot_size, is_buy, is_usd_base, commission, swap):
+    """
+    P&L of one or many trades at current_price; arguments may be scalars or
+    equal-length arrays. USD-base pairs quote P&L in the base currency, hence
+    the division by the current price.
+    """
+    pnl = np.where(is_buy, current_price - entry_price, entry_price - current_price) * lot_size * 100000
+    return np.where(is_usd_base, pnl / current_price, pnl) - (commission + swap)
+
+def compute_target_price(entry_price: float, target_amount: float, contract: float, is_usd_base: bool, is_buy: bool, is_profit: bool) -> float:
+    """Price at which a trade of `contract` units gains (or loses) target_amount USD"""
+    price_diff = target_amount * (entry_price if is_usd_base else 1.0) / contract
+    # Profit lies above entry for BUY and below it for SELL; loss is the other side
+    return entry_price + price_diff if is_buy == is_profit else entry_price - price_diff
+
 class TradeData(BaseModel):
     trade_id: str
     symbol: str
@@ -230,22 +303,24 @@ class TradeData(BaseModel):
     bias_factor: float = Field(0.0, ge=0.0, le=1.0, description="Bias factor for price movement toward target")
     closing_price: Optional[float] = None
 
+    # The simulation loop rewrites prices, swap and P&L on every tick; values
+    # there come from trusted float arrays, so assignments are never re-validated
+    model_config = ConfigDict(validate_assignment=False)
+
+    @property
+    def is_usd_base(self) -> bool:
+        return self.symbol in USD_BASE_SYMBOLS
+
     def calculate_pnl(self, current_price: float) -> float:
-        if self.trade_direction == TradeDirection.BUY:
-            price_diff = current_price - self.entry_price
-        else:
-            price_diff = self.entry_price - current_price
-        self.profit_loss = price_diff * self.lot_size * 100000
-        if self.symbol.startswith("USD"):
-            self.profit_loss /= current_price
-        self.profit_loss -= (self.commission + self.swap)
+        self.profit_loss = float(compute_pnl(current_price, self.entry_price, self.lot_size, self.trade_direction == TradeDirection.BUY, self.is_usd_base, self.commission, self.swap))
         return self.profit_loss
 
 # Database model for TradeData
 class TradeDataDB(Base):
     __tablename__ = "trades"
 
-    trade_id = Column(String, primary_key=True, index=True)
+    # The primary key already has its own unique index, so no separate one
+    trade_id = Column(String, primary_key=True)
     symbol = Column(String, nullable=False)
     entry_price = Column(Float, nullable=False)
     current_buy_price = Column(Float, nullable=False)
@@ -265,6 +340,55 @@ class TradeDataDB(Base):
     bias_factor = Column(Float, default=0.0)
     closing_price = Column(Float, nullable=True)
 
+    # History reads filter on status and order/filter by end_time (then start_time), optionally per symbol
+    __table_args__ = (
+        Index("ix_trades_status_end_time_start_time", "status", "end_time", "start_time"),
+        Index("ix_trades_symbol_status_end_time", "symbol", "status", "end_time"),
+    )
+
+# Single-statement upserts for trade snapshots, run as one executemany per batch.
+# The RUNNING-only variant leaves rows that were already finalized in the
+# database (and possibly edited by an admin) untouched.
+def build_trade_upsert(only_running: bool):
+    stmt = sqlite_insert(TradeDataDB.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[TradeDataDB.trade_id],
+        set_={column.name: stmt.excluded[column.name] for column in TradeDataDB.__table__.columns if not column.primary_key},
+        where=(TradeDataDB.status == TradeStatus.RUNNING) if only_running else None
+    )
+
+# TradeData fields map 1:1 onto trades columns, so a copy of a trade's __dict__
+# is already a complete row; fail at import if the two ever drift apart
+TRADE_COLUMNS = tuple(column.name for column in TradeDataDB.__table__.columns)
+if set(TRADE_COLUMNS) != set(TradeData.model_fields):
+    raise RuntimeError("TradeData fields and trades table columns are out of sync")
+
+# Reads every column of a TradeDataDB row in one C-level call
+TRADE_ROW_GETTER = operator.attrgetter(*TRADE_COLUMNS)
+
+def trade_from_db_row(row: TradeDataDB) -> TradeData:
+    # Column types already match the model, so skip re-validating what the DB handed back
+    return TradeData.model_construct(**dict(zip(TRADE_COLUMNS, TRADE_ROW_GETTER(row))))
+
+TRADE_UPSERT = build_trade_upsert(only_running=False)
+TRADE_UPSERT_IF_RUNNING = build_trade_upsert(only_running=True)
+
+def upsert_trade_rows(account_type: str, rows: List[dict], only_running: bool = True):
+    """Insert or overwrite trade rows in one executemany round-trip and commit.
+
+    Blocking; async callers go through save_trades so the commit runs off the event loop.
+    """
+    if not rows:
+        return
+    with account_session_makers[account_type]() as db:
+        db.execute(TRADE_UPSERT_IF_RUNNING if only_running else TRADE_UPSERT, rows)
+        db.commit()
+
+async def save_trades(account_type: str, trades: List[TradeData], only_running: bool = True):
+    # Snapshot the rows on the event loop so the worker thread never reads trades the tick loop is mutating
+    rows = [trade.__dict__.copy() for trade in trades]
+    await asyncio.to_thread(upsert_trade_rows, account_type, rows, only_running)
+
 # Database model for Profile Images
 class ProfileImageDB(Base):
     __tablename__ = "profile_images"
@@ -275,7 +399,39 @@ class ProfileImageDB(Base):
     content_type = Column(String, nullable=False)
     uploaded_at = Column(DateTime, nullable=False)
 
+# SQLite tuning applied to every new account DB connection: WAL lets the
+# simulator's frequent commits proceed without blocking API readers
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Endpoints, the tick loop and auto-save worker threads all hold sessions at once;
+# WAL lets readers run beside the single writer, so allow more than the default 5+10
+SQLITE_POOL_ARGS = {"pool_size": 10, "max_overflow": 20}
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 # Initialize databases for all accounts
+def optimize_account_databases():
+    for account_type, engine in account_engines.items():
+        if engine.dialect.name != "sqlite":
+            continue
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("PRAGMA optimize"))
+        except Exception as e:
+            logger.warning("PRAGMA optimize failed for %s: %s", account_type, e)
+
 def initialize_account_databases():
     for account_type in ACCOUNT_TYPES:
         db_url = get_database_url(account_type)
@@ -286,16 +442,26 @@ def initialize_account_databases():
             if db_dir:
                 os.makedirs(db_dir, exist_ok=True)
             
-        connect_args = {"check_same_thread": False} if db_url.startswith('sqlite') else {}
-        engine = create_engine(db_url, connect_args=connect_args)
+        if db_url.startswith('sqlite'):
+            engine = create_engine(db_url, connect_args={"check_same_thread": False}, **SQLITE_POOL_ARGS)
+            event.listen(engine, "connect", set_sqlite_pragmas)
+        else:
+            engine = create_engine(db_url)
         
-        # Create tables if they don't exist
+        # Create tables if they don't exist; create_all skips indexes on tables that already exist
         Base.metadata.create_all(bind=engine)
+        for index in TradeDataDB.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+        with engine.begin() as conn:
+            # Superseded by ix_trades_status_end_time_start_time
+            conn.execute(text("DROP INDEX IF EXISTS ix_trades_status_end_time"))
+            # Duplicated the primary key index on every insert
+            conn.execute(text("DROP INDEX IF EXISTS ix_trades_trade_id"))
         
         account_engines[account_type] = engine
         account_session_makers[account_type] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         
-        logging.info(f"Initialized database for {account_type} at {db_url}")
+        logger.info("Initialized database for %s at %s", account_type, db_url)
         try:
             with engine.connect() as conn:
                 cols = [row[1] for row in conn.execute(text("PRAGMA table_info(trades)"))]
@@ -323,9 +489,11 @@ if os.getenv('RENDER') and profile_db_url.startswith('sqlite'):
 
 connect_args = {"check_same_thread": False} if profile_db_url.startswith('sqlite') else {}
 profile_engine = create_engine(profile_db_url, connect_args=connect_args)
+if profile_db_url.startswith('sqlite'):
+    event.listen(profile_engine, "connect", set_sqlite_pragmas)
 Base.metadata.create_all(bind=profile_engine)
 ProfileSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=profile_engine)
-print(f"Profile database initialized at {profile_db_url}")
+logger.info("Profile database initialized at %s", profile_db_url)
 
 def get_db(account_type: str = "Fast/Acc"):
     """Get database session for specific account"""
@@ -343,7 +511,7 @@ def load_account_balances():
     try:
         if os.path.exists("account_balances.json"):
             with open("account_balances.json", "r") as f:
-                data = json.load(f)
+                data = orjson.loads(f.read())
                 balances = data.get("accounts", {})
                 for account_type in ACCOUNT_TYPES:
                     if account_type in balances:
@@ -351,24 +519,157 @@ def load_account_balances():
                         account_metrics_store[account_type] = AccountMetrics(
                             balance=balance, equity=balance, free_margin=balance
                         )
-                print(f"Loaded account balances from file")
+                logger.info("Loaded account balances from file")
     except Exception as e:
-        print(f"WARNING: Could not load balances: {e}")
+        logger.warning("Could not load balances: %s", e)
 
 def get_current_time_in_timezone() -> datetime:
-    tz = pytz.timezone(SYSTEM_TIMEZONE)
-    return datetime.now(tz)
+    return datetime.now(SYSTEM_TZ)
+
+def format_timestamp(moment: Optional[datetime] = None) -> str:
+    """Timestamp string carried by websocket frames and API responses"""
+    return (moment or get_current_time_in_timezone()).strftime(SYSTEM_TIMESTAMP_FORMAT)
 
 def convert_utc_to_system_timezone(utc_time: datetime) -> datetime:
     if utc_time.tzinfo is None:
         utc_time = pytz.utc.localize(utc_time)
-    tz = pytz.timezone(SYSTEM_TIMEZONE)
-    return utc_time.astimezone(tz)
+    return utc_time.astimezone(SYSTEM_TZ)
+
+def get_pip_value_for_symbol(symbol: str) -> float:
+    """Return the pip value for a given currency pair."""
+    if symbol.endswith("JPY") or symbol.endswith("RUB") or symbol.endswith("SEK"):
+        return 0.01
+    return 0.0001
+
+# Stable integer code per symbol, used to index per-symbol arrays
+SYMBOL_CODES: Dict[str, int] = {symbol: code for code, symbol in enumerate(CURRENCY_PAIRS)}
+
+# Per-symbol constants that never change at runtime, indexed by SYMBOL_CODES
+SYMBOL_PIP_VALUES = np.array([get_pip_value_for_symbol(symbol) for symbol in CURRENCY_PAIRS])
+SYMBOL_IS_USD_BASE = np.array([symbol in USD_BASE_SYMBOLS for symbol in CURRENCY_PAIRS])
+
+class ActiveTradesSoA:
+    """
+    Struct-of-arrays mirror of one account's active trades.
+
+    The simulation loop advances every row with a handful of numpy operations
+    instead of one Python call per trade. Rows are kept dense: removing a trade
+    moves the last row into the freed slot and re-points its trade_id.
+    """
+    FLOAT_COLUMNS = ("current_buy_price", "target_price", "bias_factor", "start_epoch", "entry_price", "lot_size", "commission", "profit_loss", "swap", "target_threshold")
+    BOOL_COLUMNS = ("is_buy", "is_profit_target", "is_running")
+    INT_COLUMNS = ("symbol_code",)
+    COLUMNS = FLOAT_COLUMNS + BOOL_COLUMNS + INT_COLUMNS
+
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.trade_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.float64))
+        for name in self.BOOL_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=bool))
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.intp))
+
+    def _grow(self):
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _write_row(self, row: int, trade: TradeData):
+        self.current_buy_price[row] = trade.current_buy_price
+        self.target_price[row] = trade.target_price
+        self.bias_factor[row] = trade.bias_factor
+        self.is_buy[row] = trade.trade_direction == TradeDirection.BUY
+        self.is_profit_target[row] = trade.target_type == TargetType.PROFIT
+        self.symbol_code[row] = SYMBOL_CODES[trade.symbol]
+        self.entry_price[row] = trade.entry_price
+        self.lot_size[row] = trade.lot_size
+        self.commission[row] = trade.commission
+        self.profit_loss[row] = trade.profit_loss
+        self.swap[row] = trade.swap
+        self.is_running[row] = trade.status == TradeStatus.RUNNING
+        # Signed P&L level at which the trade closes: +amount for profit targets, -amount for loss targets
+        self.target_threshold[row] = trade.target_amount if trade.target_type == TargetType.PROFIT else -trade.target_amount
+        # start_time is stored naive in the system timezone; keep it as epoch seconds for swap accrual
+        self.start_epoch[row] = SYSTEM_TZ.localize(trade.start_time).timestamp()
+
+    def add(self, trade: TradeData):
+        if self.size == len(self.current_buy_price):
+            self._grow()
+        row = self.size
+        self.rows[trade.trade_id] = row
+        self.trade_ids.append(trade.trade_id)
+        self.size += 1
+        self._write_row(row, trade)
+
+    def update(self, trade: TradeData):
+        """Re-copy a trade's fields after an endpoint changed its target or bias"""
+        row = self.rows.get(trade.trade_id)
+        if row is not None:
+            self._write_row(row, trade)
+
+    def mark_closed(self, trade_id: str):
+        """Exclude a trade from account totals while it waits to be persisted and removed"""
+        row = self.rows.get(trade_id)
+        if row is not None:
+            self.is_running[row] = False
+
+    def remove(self, trade_id: str):
+        row = self.rows.pop(trade_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        last_id = self.trade_ids.pop()
+        if row != last:
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[row] = column[last]
+            self.trade_ids[row] = last_id
+            self.rows[last_id] = row
+        self.size = last
+
+    def clear(self):
+        self.size = 0
+        self.trade_ids.clear()
+        self.rows.clear()
+
+class SymbolParams:
+    """
+    Per-symbol simulation settings of one account as arrays indexed by SYMBOL_CODES.
+
+    Rebuilt whenever the account's currency pair settings change, so the tick
+    loop gathers volatility, spread and enabled flags per row by fancy indexing
+    instead of reading CurrencyPairConfig objects trade by trade.
+    """
+    def __init__(self, currency_pair_settings: Dict[str, "CurrencyPairConfig"]):
+        configs = [currency_pair_settings[symbol] for symbol in CURRENCY_PAIRS]
+        self.volatility = np.array([config.volatility for config in configs])
+        self.spread = np.array([config.spread for config in configs])
+        self.buy_enabled = np.array([config.buy_enabled for config in configs])
+        self.sell_enabled = np.array([config.sell_enabled for config in configs])
 
 # In-memory storage for each account
 active_trades_store: Dict[str, Dict[str, TradeData]] = {acc: {} for acc in ACCOUNT_TYPES}
+# Same trades keyed by symbol, for symbol-filtered listings
+active_trades_by_symbol: Dict[str, Dict[str, Dict[str, TradeData]]] = {acc: {symbol: {} for symbol in CURRENCY_PAIRS} for acc in ACCOUNT_TYPES}
+active_trade_arrays: Dict[str, ActiveTradesSoA] = {acc: ActiveTradesSoA() for acc in ACCOUNT_TYPES}
+# Every account's active trades by id, so trade endpoints resolve the owning account in one lookup
+trade_index: Dict[str, Tuple[str, TradeData]] = {}
 currency_pair_settings_store: Dict[str, Dict[str, CurrencyPairConfig]] = {}
 account_metrics_store: Dict[str, AccountMetrics] = {}
+symbol_params_store: Dict[str, SymbolParams] = {}
+# Set whenever an account's active trades change; populated at startup
+trades_dirty: Dict[str, asyncio.Event] = {}
+# Active trades changed since the last auto-save
+dirty_trade_ids: Dict[str, Set[str]] = {acc: set() for acc in ACCOUNT_TYPES}
+# (margin, pnl, swap) summed over running trades; None once any active trade changes
+trade_totals_cache: Dict[str, Optional[Tuple[float, float, float]]] = {acc: None for acc in ACCOUNT_TYPES}
+# (metrics object, its dict form, (totals, balance, deposit) it was derived from) as of the last update_account_metrics call
+account_metrics_dump_cache: Dict[str, Tuple[AccountMetrics, dict, tuple]] = {}
 
 # Initialize default settings for each account
 for account_type in ACCOUNT_TYPES:
@@ -385,25 +686,66 @@ for account_type in ACCOUNT_TYPES:
         "XAUAUD": CurrencyPairConfig(symbol="XAUAUD", buy_starting_price=4100.00, sell_starting_price=4100.80, volatility=0.00005, spread=0.80, buy_lot_size=0.01, sell_lot_size=0.01, default_target_profit=10.0, default_target_loss=5.0, pip_value=0.01, mean_reversion_strength=0.05),
         "USDCAD": CurrencyPairConfig(symbol="USDCAD", buy_starting_price=1.3580, sell_starting_price=1.3582, volatility=0.00005, spread=0.0002, buy_lot_size=0.01, sell_lot_size=0.01, default_target_profit=10.0, default_target_loss=5.0, pip_value=0.0001, mean_reversion_strength=0.05)
     }
+    symbol_params_store[account_type] = SymbolParams(currency_pair_settings_store[account_type])
     account_metrics_store[account_type] = AccountMetrics(balance=DEFAULT_ACCOUNT_BALANCE, equity=DEFAULT_ACCOUNT_BALANCE, free_margin=DEFAULT_ACCOUNT_BALANCE)
 
 # WebSocket manager
+def encode_json(payload) -> str:
+    """Serialize an outbound websocket frame; orjson handles datetimes and numpy scalars natively.
+    Frames stay text because the web and Android clients only listen for text messages."""
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+# Heartbeat exactly as the web and Android clients serialize it, and the constant reply
+PING_FRAME = '{"type":"ping"}'
+PONG_FRAME = encode_json({"type": "pong"})
+# Greeting sent on connect; websocket clients always start as a non-admin USER, so only
+# the client id, current account and timestamp are filled in (each JSON-encoded) per connection
+CONNECTION_ESTABLISHED_TEMPLATE = '{"type":"connection_established","client_id":%s,"role":"USER","is_admin":false,"current_account":%s,"timestamp":%s}'
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Endpoint events waiting for the next batched frame, and the task that will send it
+        self.pending_events: List[dict] = []
+        self.flush_task: Optional[asyncio.Task] = None
 
     async def connect(self, websocket: WebSocket):
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # A failed broadcast may already have pruned this socket
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+
+    async def broadcast_json(self, payload: dict):
+        """Encode once for every client, and not at all when nobody is connected"""
+        if self.active_connections:
+            await self.broadcast(encode_json(payload))
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+        """Send to every client concurrently and drop the ones whose send failed"""
+        connections = list(self.active_connections)
+        # A stalled client times out instead of holding every later frame back
+        results = await asyncio.gather(*(asyncio.wait_for(connection.send_text(message), WS_SEND_TIMEOUT_SECONDS) for connection in connections), return_exceptions=True)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.warning("Dropping websocket client after failed send: %r", result)
+                self.disconnect(connection)
+
+    def queue_event(self, payload: dict):
+        """Broadcast payload together with any other events queued within EVENT_BATCH_SECONDS"""
+        if not self.active_connections:
+            return
+        self.pending_events.append(payload)
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_events())
+
+    async def flush_events(self):
+        await asyncio.sleep(EVENT_BATCH_SECONDS)
+        events, self.pending_events = self.pending_events, []
+        self.flush_task = None
+        # A lone event goes out as itself; bursts share one {"type": "batch"} frame
+        await self.broadcast_json(events[0] if len(events) == 1 else {"type": "batch", "events": events})
 
 manager = ConnectionManager()
 
@@ -432,279 +774,230 @@ async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCrede
     except JWTError:
         return TokenData(username=None, role=UserRole.USER, is_first_admin=False)
 
-def get_pip_value_for_symbol(symbol: str) -> float:
-    """Return the pip value for a given currency pair."""
-    if symbol.endswith("JPY") or symbol.endswith("RUB") or symbol.endswith("SEK"):
-        return 0.01
-    return 0.0001
+# Shared PCG64 generator for the price simulation; each tick draws all its noise in one call
+RNG = np.random.default_rng()
 
-def generate_mt5_price(previous_price: float, volatility: float, mean_price: float, 
-                      mean_reversion_strength: float, target_price: float, bias_factor: float, 
-                      trade_direction: TradeDirection, target_type: TargetType,
-                      symbol: str, entry_price: float = None, target_amount: float = 0.0) -> float:
+def generate_mt5_prices(previous_price: np.ndarray, volatility: np.ndarray, target_price: np.ndarray,
+                        bias_factor: np.ndarray, is_buy: np.ndarray, is_profit_target: np.ndarray,
+                        pip_value: np.ndarray) -> np.ndarray:
     """
     Generate realistic MT5 price simulation with directional oscillation toward target.
     
     Key Features:
-    1. Initial directional drift determined by target_amount and target_type
+    1. Initial directional drift determined by target_price relative to the current price
     2. Oscillation ratio 5:2 (forward:backward) before bias - mixed manner
     3. Oscillation ratio 6:2 (forward:backward) after bias - mixed manner
     4. Forward = toward target (profit or loss), Backward = away from target
     
-    Real MT5 Behavior:
-    - Prices oscillate toward target based on target_type (PROFIT or LOSS)
-    - When bias triggered, stronger forward tendency (6:2 ratio) + faster movement
-    - Oscillations are mixed (not sequential forward then backward)
+    Every argument is a column of ActiveTradesSoA (one element per trade), so a
+    whole account advances one tick in a fixed number of numpy operations.
     """
-    # Get pip value for this symbol
-    pip_value = get_pip_value_for_symbol(symbol)
+    count = len(previous_price)
+    biased = bias_factor > 0
+    # Row 0 decides forward/backward, row 1 scales the magnitude
+    direction_draw, magnitude_draw = RNG.random((2, count))
     
     # ========================================================================
-    # DETERMINE DIRECTIONAL DRIFT BASED ON TARGET_TYPE AND TARGET_AMOUNT
+    # DETERMINE DIRECTIONAL DRIFT TOWARD TARGET_PRICE
     # ========================================================================
-    # For PROFIT target: price should move to increase P&L (toward target_price)
-    # For LOSS target: price should move to decrease P&L (toward target_price for loss)
-    # The target_price already encodes the direction based on target_type
-    
-    # Calculate which direction is "forward" (toward achieving the target)
-    if target_type == TargetType.PROFIT:
-        # For profit: move toward higher P&L
-        if trade_direction == TradeDirection.BUY:
-            # BUY trade profits when price goes up
-            direction_to_target = 1 if target_price > previous_price else -1
-        else:  # SELL
-            # SELL trade profits when price goes down
-            direction_to_target = -1 if target_price < previous_price else 1
-    else:  # TargetType.LOSS
-        # For loss: move toward lower P&L (more negative)
-        if trade_direction == TradeDirection.BUY:
-            # BUY trade loses when price goes down
-            direction_to_target = -1 if target_price < previous_price else 1
-        else:  # SELL
-            # SELL trade loses when price goes up
-            direction_to_target = 1 if target_price > previous_price else -1
+    # The target_price already encodes the direction based on target_type, so
+    # "forward" is simply toward it. On an exact tie, BUY/PROFIT and SELL/LOSS
+    # step down while BUY/LOSS and SELL/PROFIT step up.
+    tie_direction = np.where(is_buy == is_profit_target, -1.0, 1.0)
+    direction_to_target = np.where(target_price > previous_price, 1.0,
+                                   np.where(target_price < previous_price, -1.0, tie_direction))
     
     # ========================================================================
     # OSCILLATION RATIO: 5:2 (no bias) or 6:2 (with bias) - MIXED MANNER
     # ========================================================================
-    if bias_factor > 0:
-        # Biased: 6:2 ratio = 6/(6+2) = 75% chance of moving forward
-        forward_probability = 6.0 / 8.0
-    else:
-        # Normal: 5:2 ratio = 5/(5+2) ≈ 71.4% chance of moving forward
-        forward_probability = 5.0 / 7.0
-    
-    # Randomly determine if this tick moves forward or backward (MIXED pattern)
-    is_forward = np.random.random() < forward_probability
-    movement_direction = direction_to_target if is_forward else -direction_to_target
+    forward_probability = np.where(biased, 6.0 / 8.0, 5.0 / 7.0)
+    is_forward = direction_draw < forward_probability
+    movement_direction = np.where(is_forward, direction_to_target, -direction_to_target)
     
     # ========================================================================
     # MOVEMENT MAGNITUDE: How much to move per tick
     # ========================================================================
-    if bias_factor > 0:
-        # Biased: larger movements for faster target achievement
-        base_magnitude = volatility * 0.25
-        # Additional drift component when biased (boost toward target)
-        distance_ratio = abs(target_price - previous_price) / previous_price
-        drift_boost = min(distance_ratio * 0.1, 0.002)  # Cap at 0.2%
-        movement_magnitude = base_magnitude + drift_boost
-    else:
-        # Normal: standard movement magnitude
-        base_magnitude = volatility * 0.2
-        movement_magnitude = base_magnitude
+    # Biased trades get larger movements plus a drift boost toward the target (capped at 0.2%)
+    drift_boost = np.minimum(np.abs(target_price - previous_price) / previous_price * 0.1, 0.002)
+    movement_magnitude = np.where(biased, volatility * 0.25 + drift_boost, volatility * 0.2)
     
     # Add some randomness to magnitude (not just direction)
-    magnitude_variation = np.random.uniform(0.5, 1.5)
-    final_magnitude = movement_magnitude * magnitude_variation
-    
-    # ========================================================================
-    # CALCULATE PRICE CHANGE
-    # ========================================================================
-    price_change = movement_direction * final_magnitude
-    new_price = previous_price * (1 + price_change)
+    final_magnitude = movement_magnitude * (0.5 + magnitude_draw)
     
     # ========================================================================
-    # BOUNDS: Limit maximum change per tick (realistic MT5 behavior)
+    # CALCULATE PRICE CHANGE AND BOUNDS (realistic MT5 behavior)
     # ========================================================================
-    max_pips = 3 if bias_factor == 0 else 5
-    max_change = max_pips * pip_value
-    
-    new_price = max(previous_price - max_change, min(previous_price + max_change, new_price))
+    new_price = previous_price * (1 + movement_direction * final_magnitude)
+    max_change = np.where(biased, 5.0, 3.0) * pip_value
+    new_price = np.clip(new_price, previous_price - max_change, previous_price + max_change)
     
     # Ensure price never goes negative or zero
-    return max(pip_value, new_price)
+    return np.maximum(new_price, pip_value)
+
+def mark_trades_dirty(account_type: str, trade_ids: Iterable[str]):
+    """Queue trades for the next auto-save, wake the auto-save task and drop cached metric totals"""
+    dirty_trade_ids[account_type].update(trade_ids)
+    trades_dirty[account_type].set()
+    trade_totals_cache[account_type] = None
+
+def add_active_trade(account_type: str, trade: TradeData):
+    """Register a trade in the account's active dict and its array mirror"""
+    # CORRECT MARGIN: No price multiplier — MT5 uses fixed formula; lot size never changes while active
+    trade.margin_used = (trade.lot_size * CONTRACT_SIZE) / DEFAULT_LEVERAGE
+    active_trades_store[account_type][trade.trade_id] = trade
+    active_trades_by_symbol[account_type][trade.symbol][trade.trade_id] = trade
+    trade_index[trade.trade_id] = (account_type, trade)
+    active_trade_arrays[account_type].add(trade)
+    mark_trades_dirty(account_type, (trade.trade_id,))
+
+def remove_active_trade(account_type: str, trade_id: str) -> Optional[TradeData]:
+    """Drop a trade from the account's active dict and its array mirror; None if it was not active"""
+    trade = active_trades_store[account_type].pop(trade_id, None)
+    if trade is None:
+        return None
+    active_trades_by_symbol[account_type][trade.symbol].pop(trade_id, None)
+    trade_index.pop(trade_id, None)
+    active_trade_arrays[account_type].remove(trade_id)
+    trade_totals_cache[account_type] = None
+    return trade
 
 # Account-specific trade simulation loop
-async def account_simulate_trades(account_type: str):
+async def account_simulate_trades(account_type: str, start_offset: float = 0.0):
     """Simulate trades for a specific account"""
+    # Sleep to absolute deadlines so time spent in a tick doesn't push the next one back
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time() + start_offset
     while True:
-        await asyncio.sleep(1)
+        # After an overrun, skip the missed ticks instead of running them back to back
+        next_tick = max(next_tick + SIMULATION_TICK_SECONDS, loop.time())
+        await asyncio.sleep(next_tick - loop.time())
         
         active_trades = active_trades_store[account_type]
-        currency_pair_settings = currency_pair_settings_store[account_type]
+        symbol_params = symbol_params_store[account_type]
         account_metrics = account_metrics_store[account_type]
+        trade_arrays = active_trade_arrays[account_type]
         
-        trades_to_remove = []
+        price_updates = []
         
-        for trade_id, trade in list(active_trades.items()):
-            if trade.status != TradeStatus.RUNNING:
+        # Advance every active trade's price in one vectorized step. Iterating the
+        # row snapshot keeps new_buy_prices aligned even if an endpoint opens or
+        # closes trades while this loop awaits a broadcast.
+        count = trade_arrays.size
+        tick_trade_ids = trade_arrays.trade_ids[:count]
+        # One clock read per tick; stored WITHOUT timezone info like every DB timestamp
+        tick_epoch = time.time()
+        tick_now = get_current_time_in_timezone()
+        tick_time = tick_now.replace(tzinfo=None)
+        # Every frame sent during this tick carries the same timestamp string
+        tick_timestamp = format_timestamp(tick_now)
+        days_elapsed = (tick_epoch - trade_arrays.start_epoch[:count]) / (24 * 3600)
+        symbol_codes = trade_arrays.symbol_code[:count]
+        is_buy = trade_arrays.is_buy[:count]
+        is_profit_target = trade_arrays.is_profit_target[:count]
+        spread = symbol_params.spread[symbol_codes]
+        is_usd_base = SYMBOL_IS_USD_BASE[symbol_codes]
+        lot_size = trade_arrays.lot_size[:count]
+        entry_price = trade_arrays.entry_price[:count]
+        disabled_by_row = np.where(is_buy, ~symbol_params.buy_enabled[symbol_codes], ~symbol_params.sell_enabled[symbol_codes]).tolist()
+        new_buy_prices = generate_mt5_prices(
+            previous_price=trade_arrays.current_buy_price[:count],
+            volatility=symbol_params.volatility[symbol_codes],
+            target_price=trade_arrays.target_price[:count],
+            bias_factor=trade_arrays.bias_factor[:count],
+            is_buy=is_buy,
+            is_profit_target=is_profit_target,
+            pip_value=SYMBOL_PIP_VALUES[symbol_codes]
+        )
+        new_sell_prices = new_buy_prices + spread
+        current_prices = np.where(is_buy, new_buy_prices, new_sell_prices)
+        swaps = np.where(is_buy, SWAP_RATE_BUY, SWAP_RATE_SELL) * lot_size * 100000 * days_elapsed
+        pnl = compute_pnl(current_prices, entry_price, lot_size, is_buy, is_usd_base, trade_arrays.commission[:count], swaps)
+
+        # Branchless target detection: a trade closes when its P&L crosses the
+        # signed threshold in the target's direction since the previous tick
+        previous_pnl = trade_arrays.profit_loss[:count]
+        thresholds = trade_arrays.target_threshold[:count]
+        crossed = np.where(is_profit_target, (previous_pnl < thresholds) & (thresholds <= pnl), (previous_pnl > thresholds) & (thresholds >= pnl))
+
+        # INTERPOLATION: pin closing trades to their exact target P&L and
+        # back-calculate the price that yields it, so nothing overshoots.
+        # For USD-base pairs profit_loss = (price - entry) * lot * 100000 / price - fees
+        hit = np.nonzero(crossed)[0]
+        if hit.size:
+            hit_is_buy = is_buy[hit]
+            price_adjust = np.where(is_usd_base[hit], entry_price[hit], 1.0)
+            target_price_diff = (thresholds[hit] + trade_arrays.commission[hit] + swaps[hit]) * price_adjust / (lot_size[hit] * 100000)
+            anchor_price = entry_price[hit] + np.where(hit_is_buy, 1.0, -1.0) * target_price_diff
+            new_buy_prices[hit] = np.where(hit_is_buy, anchor_price, anchor_price - spread[hit])
+            new_sell_prices[hit] = np.where(hit_is_buy, anchor_price + spread[hit], anchor_price)
+            pnl[hit] = thresholds[hit]
+
+        # Write back before the first await so rows cannot be reshuffled underneath
+        trade_arrays.current_buy_price[:count] = new_buy_prices
+        trade_arrays.profit_loss[:count] = pnl
+        trade_arrays.swap[:count] = swaps
+        new_buy_prices = new_buy_prices.tolist()
+        new_sell_prices = new_sell_prices.tolist()
+        swaps = swaps.tolist()
+        pnl = pnl.tolist()
+        crossed_by_row = crossed.tolist()
+        
+        for tick_row, trade_id in enumerate(tick_trade_ids):
+            trade = active_trades.get(trade_id)
+            if trade is None or trade.status != TradeStatus.RUNNING:
                 continue
 
-            symbol_settings = currency_pair_settings.get(trade.symbol)
-            if not symbol_settings or (trade.trade_direction == TradeDirection.BUY and not symbol_settings.buy_enabled) or (trade.trade_direction == TradeDirection.SELL and not symbol_settings.sell_enabled):
+            if disabled_by_row[tick_row]:
                 trade.status = TradeStatus.STOPPED
-                # Store WITHOUT timezone info in database
-                trade.end_time = get_current_time_in_timezone().replace(tzinfo=None)
+                trade_arrays.mark_closed(trade_id)
+                mark_trades_dirty(account_type, (trade_id,))
+                trade.end_time = tick_time
                 trade.closing_price = trade.current_buy_price if trade.trade_direction == TradeDirection.BUY else trade.current_sell_price
                 account_metrics.balance += trade.profit_loss
                 await update_account_metrics(account_type)
-                await notify_trade_update(account_type, trade, "disabled")
+                price_updates.append(trade_price_fields(trade))
+                await notify_trade_update(account_type, trade, "disabled", send_price_update=False, timestamp=tick_timestamp)
                 
                 # Save to database and remove from active trades
-                SessionLocal = account_session_makers[account_type]
-                with SessionLocal() as db:
-                    # Check if trade already exists in database
-                    existing_trade = db.query(TradeDataDB).filter(
-                        TradeDataDB.trade_id == trade_id
-                    ).first()
-                    
-                    if existing_trade:
-                        # Update existing trade
-                        for key, value in trade.dict().items():
-                            setattr(existing_trade, key, value)
-                    else:
-                        # Insert new trade
-                        db_trade = TradeDataDB(**trade.dict())
-                        db.add(db_trade)
-                    
-                    db.commit()
-                    print(f"Transferred stopped trade {trade_id} to database")
+                await save_trades(account_type, [trade], only_running=False)
+                logger.debug("Transferred stopped trade %s to database", trade_id)
                 
-                # Mark for removal from active trades
-                trades_to_remove.append(trade_id)
+                # Per-row values were copied out before the loop, so the swap-remove is safe mid-iteration
+                remove_active_trade(account_type, trade_id)
+                logger.debug("Removed trade %s from active trades", trade_id)
                 continue
 
-            mean_price = symbol_settings.buy_starting_price
-            
-            # Store previous price for overshoot detection
-            previous_buy_price = trade.current_buy_price
-            previous_sell_price = trade.current_sell_price
-            
-            # Store previous P&L for comparison
-            previous_pnl = trade.profit_loss
-            
-            # Generate new price with proper pip value normalization
-            # Pass entry_price so price oscillates around it (realistic back-and-forth P&L)
-            new_buy_price = generate_mt5_price(
-                previous_price=trade.current_buy_price,
-                volatility=symbol_settings.volatility,
-                mean_price=mean_price,
-                mean_reversion_strength=symbol_settings.mean_reversion_strength,
-                target_price=trade.target_price,
-                bias_factor=trade.bias_factor,
-                trade_direction=trade.trade_direction,
-                target_type=trade.target_type,
-                symbol=trade.symbol,
-                entry_price=trade.entry_price,  # Oscillate around entry price for realistic P&L fluctuation
-                target_amount=trade.target_amount  # Consider target amount for directional drift
+            # Plain dict write: skips BaseModel.__setattr__ dispatch for the four hot fields
+            trade.__dict__.update(
+                current_buy_price=new_buy_prices[tick_row],
+                current_sell_price=new_sell_prices[tick_row],
+                swap=swaps[tick_row],
+                profit_loss=pnl[tick_row]
             )
-            new_sell_price = new_buy_price + symbol_settings.spread
-            trade.current_buy_price = new_buy_price
-            trade.current_sell_price = new_sell_price
-
-            current_time = get_current_time_in_timezone().replace(tzinfo=None)
-            seconds_elapsed = (current_time - trade.start_time).total_seconds()
-            days_elapsed = seconds_elapsed / (24 * 3600)
-            swap_rate = SWAP_RATE_BUY if trade.trade_direction == TradeDirection.BUY else SWAP_RATE_SELL
-            trade.swap = swap_rate * trade.lot_size * 100000 * days_elapsed
-
-            current_price = new_buy_price if trade.trade_direction == TradeDirection.BUY else new_sell_price
-            trade.calculate_pnl(current_price)
-
-            # Precise target detection with interpolation
-            target_reached = False
-            reason = ""
-            
-            if trade.target_type == TargetType.PROFIT:
-                # For profit targets, check if we crossed the threshold
-                if previous_pnl < trade.target_amount <= trade.profit_loss:
-                    target_reached = True
-                    reason = "target_profit_reached"
-                    
-                    # INTERPOLATION: Set exact target P&L to prevent overshoot
-                    trade.profit_loss = trade.target_amount
-                    
-                    # Back-calculate the exact price that gives this P&L
-                    if trade.trade_direction == TradeDirection.BUY:
-                        if trade.symbol.startswith("USD"):
-                            # For USD pairs: profit_loss = (price - entry) * lot * 100000 / price - fees
-                            target_price_diff = (trade.target_amount + trade.commission + trade.swap) * trade.entry_price / (trade.lot_size * 100000)
-                            trade.current_buy_price = trade.entry_price + target_price_diff
-                        else:
-                            target_price_diff = (trade.target_amount + trade.commission + trade.swap) / (trade.lot_size * 100000)
-                            trade.current_buy_price = trade.entry_price + target_price_diff
-                        trade.current_sell_price = trade.current_buy_price + symbol_settings.spread
-                    else:  # SELL
-                        if trade.symbol.startswith("USD"):
-                            target_price_diff = (trade.target_amount + trade.commission + trade.swap) * trade.entry_price / (trade.lot_size * 100000)
-                            trade.current_sell_price = trade.entry_price - target_price_diff
-                        else:
-                            target_price_diff = (trade.target_amount + trade.commission + trade.swap) / (trade.lot_size * 100000)
-                            trade.current_sell_price = trade.entry_price - target_price_diff
-                        trade.current_buy_price = trade.current_sell_price - symbol_settings.spread
-                        
-            elif trade.target_type == TargetType.LOSS:
-                # For loss targets, check if we crossed the threshold (loss is negative)
-                if previous_pnl > -trade.target_amount >= trade.profit_loss:
-                    target_reached = True
-                    reason = "target_loss_reached"
-                    
-                    # INTERPOLATION: Set exact target loss
-                    trade.profit_loss = -trade.target_amount
-                    
-                    # Back-calculate exact price
-                    if trade.trade_direction == TradeDirection.BUY:
-                        if trade.symbol.startswith("USD"):
-                            target_price_diff = (-trade.target_amount + trade.commission + trade.swap) * trade.entry_price / (trade.lot_size * 100000)
-                            trade.current_buy_price = trade.entry_price + target_price_diff
-                        else:
-                            target_price_diff = (-trade.target_amount + trade.commission + trade.swap) / (trade.lot_size * 100000)
-                            trade.current_buy_price = trade.entry_price + target_price_diff
-                        trade.current_sell_price = trade.current_buy_price + symbol_settings.spread
-                    else:  # SELL
-                        if trade.symbol.startswith("USD"):
-                            target_price_diff = (-trade.target_amount + trade.commission + trade.swap) * trade.entry_price / (trade.lot_size * 100000)
-                            trade.current_sell_price = trade.entry_price - target_price_diff
-                        else:
-                            target_price_diff = (-trade.target_amount + trade.commission + trade.swap) / (trade.lot_size * 100000)
-                            trade.current_sell_price = trade.entry_price - target_price_diff
-                        trade.current_buy_price = trade.current_sell_price - symbol_settings.spread
-
-            if target_reached:
+
+            if crossed_by_row[tick_row]:
+                reason = "target_profit_reached" if trade.target_type == TargetType.PROFIT else "target_loss_reached"
                 trade.status = TradeStatus.COMPLETED
-                # Store WITHOUT timezone info in database
-                trade.end_time = get_current_time_in_timezone().replace(tzinfo=None)
+                trade_arrays.mark_closed(trade_id)
+                mark_trades_dirty(account_type, (trade_id,))
+                trade.end_time = tick_time
                 trade.closing_price = trade.current_buy_price if trade.trade_direction == TradeDirection.BUY else trade.current_sell_price
                 account_metrics.balance += trade.profit_loss
-                await notify_trade_update(account_type, trade, reason)
+                await notify_trade_update(account_type, trade, reason, send_price_update=False, timestamp=tick_timestamp)
                 
-                # Immediately transfer the completed trade to the database
+                # Immediately transfer the completed trade to the database; this also removes it from active trades
                 await transfer_completed_trades_to_database(account_type, trade_id)
-                # Mark for removal from active trades
-                trades_to_remove.append(trade_id)
-            else:
-                await broadcast_trade_update(account_type, trade)
 
+            price_updates.append(trade_price_fields(trade))
+
+        if count:
+            mark_trades_dirty(account_type, tick_trade_ids)
         await update_account_metrics(account_type)
+        if price_updates:
+            await broadcast_price_updates(account_type, price_updates, tick_timestamp)
         
         # Broadcast real-time Exness stats after each simulation cycle
-        await broadcast_exness_stats(account_type)
-
-        # Remove completed/stopped trades from active_trades
-        for tid in trades_to_remove:
-            if tid in active_trades:
-                del active_trades[tid]
-                print(f"Removed trade {tid} from active trades")
+        await broadcast_exness_stats(account_type, tick_timestamp)
 
 async def transfer_completed_trades_to_database(account_type: str, trade_id: str = None):
     """Transfer completed or stopped trades from active_trades to database
@@ -715,7 +1008,6 @@ async def transfer_completed_trades_to_database(account_type: str, trade_id: str
     """
     try:
         active_trades = active_trades_store[account_type]
-        SessionLocal = account_session_makers[account_type]
         completed_trades = []
         
         # If specific trade_id is provided, only process that trade
@@ -724,124 +1016,89 @@ async def transfer_completed_trades_to_database(account_type: str, trade_id: str
             if trade and trade.status in [TradeStatus.COMPLETED, TradeStatus.STOPPED]:
                 completed_trades = [(trade_id, trade)]
         else:
-            # Otherwise, process all completed/stopped trades
-            for tid, t in list(active_trades.items()):
-                if t.status in [TradeStatus.COMPLETED, TradeStatus.STOPPED]:
-                    completed_trades.append((tid, t))
+            # Otherwise, process all completed/stopped trades. Nothing awaits while
+            # scanning, so the dict can be iterated without copying it first
+            completed_trades = [(tid, t) for tid, t in active_trades.items() if t.status in (TradeStatus.COMPLETED, TradeStatus.STOPPED)]
         
         if not completed_trades:
             return
         
         trades_to_remove = []
         
-        # Process completed trades in a single transaction
-        with SessionLocal() as db:
-            for tid, trade in completed_trades:
-                try:
-                    # Check if trade exists in database
-                    existing_trade = db.query(TradeDataDB).filter(
-                        TradeDataDB.trade_id == tid
-                    ).first()
-                    
-                    if existing_trade:
-                        # Only update if the trade is still RUNNING in database
-                        if existing_trade.status == TradeStatus.RUNNING:
-                            for key, value in trade.dict().items():
-                                setattr(existing_trade, key, value)
-                    else:
-                        # Insert new trade
-                        db_trade = TradeDataDB(**trade.dict())
-                        db.add(db_trade)
-                    
-                    trades_to_remove.append(tid)
-                    
-                except Exception as e:
-                    print(f"WARNING: Error processing trade {tid}: {e}")
-                    continue  # Continue with next trade even if one fails
-            
-            try:
-                db.commit()
-                
-                # Remove from active trades after successful DB commit
-                for tid in trades_to_remove:
-                    if tid in active_trades:
-                        del active_trades[tid]
-                        print(f"Removed trade {tid} from active trades after DB commit")
-                
-                if trades_to_remove:
-                    print(f"Transferred {len(trades_to_remove)} completed/stopped trades to database for {account_type} account")
-                    
-            except Exception as commit_error:
-                db.rollback()
-                print(f"WARNING: Database commit failed: {commit_error}")
-                return  # Don't remove trades if commit failed
+        # Process completed trades in a single transaction and statement
+        try:
+            await save_trades(account_type, [trade for _, trade in completed_trades])
+        except Exception as commit_error:
+            logger.warning("Database commit failed: %s", commit_error)
+            return  # Don't remove trades if commit failed
+        trades_to_remove = [tid for tid, _ in completed_trades]
+        
+        # Remove from active trades after successful DB commit
+        for tid in trades_to_remove:
+            if remove_active_trade(account_type, tid) is not None:
+                logger.debug("Removed trade %s from active trades after DB commit", tid)
+        
+        if trades_to_remove:
+            logger.debug("Transferred %s completed/stopped trades to database for %s account", len(trades_to_remove), account_type)
             
     except Exception as e:
-        print(f"WARNING: Error transferring completed trades to database for {account_type}: {e}")
+        logger.warning("Error transferring completed trades to database for %s: %s", account_type, e)
         # If there was an error, try to clean up any trades that were already processed
         if 'trades_to_remove' in locals():
             for tid in trades_to_remove:
-                if tid in active_trades and active_trades[tid].status in [TradeStatus.COMPLETED, TradeStatus.STOPPED]:
-                    del active_trades[tid]
-                    print(f"Removed trade {tid} from active trades after error")
+                trade = active_trades.get(tid)
+                if trade is not None and trade.status in (TradeStatus.COMPLETED, TradeStatus.STOPPED):
+                    remove_active_trade(account_type, tid)
+                    logger.debug("Removed trade %s from active trades after error", tid)
 
 async def auto_save_trades_to_database(account_type: str):
-    """Automatically save active trade snapshots to database every 30 seconds"""
+    """Save active trade snapshots to database at most every AUTO_SAVE_SECONDS, and only after a change"""
+    dirty = trades_dirty[account_type]
     while True:
-        await asyncio.sleep(30)  # Update every 30 seconds
+        await dirty.wait()
+        # Coalesce every change in the window into one save; later changes re-set the event
+        await asyncio.sleep(AUTO_SAVE_SECONDS)
+        dirty.clear()
         
+        active_trades = active_trades_store[account_type]
+        trade_ids, dirty_trade_ids[account_type] = dirty_trade_ids[account_type], set()
+        # Completed/stopped trades are transferred and changed RUNNING trades updated in one transaction
+        closed_ids = [tid for tid, t in active_trades.items() if t.status in (TradeStatus.COMPLETED, TradeStatus.STOPPED)]
+        running_ids = [tid for tid in trade_ids if tid in active_trades and active_trades[tid].status == TradeStatus.RUNNING]
         try:
-            # First, transfer any completed/stopped trades to database
-            await transfer_completed_trades_to_database(account_type)
-            
-            # Then update active trades
-            active_trades = active_trades_store[account_type]
-            SessionLocal = account_session_makers[account_type]
-            
-            with SessionLocal() as db:
-                # Update or insert all RUNNING trades in the database
-                for trade_id, trade in active_trades.items():
-                    # Skip non-running trades (should be handled by transfer_completed_trades_to_database)
-                    if trade.status != TradeStatus.RUNNING:
-                        continue
-                        
-                    # Check if trade exists in database
-                    existing_trade = db.query(TradeDataDB).filter(
-                        TradeDataDB.trade_id == trade_id
-                    ).first()
-                    
-                    if existing_trade:
-                        # For existing trades, only update if they're RUNNING in database
-                        if existing_trade.status == TradeStatus.RUNNING:
-                            for key, value in trade.dict().items():
-                                setattr(existing_trade, key, value)
-                    else:
-                        # Insert new trade snapshot
-                        db_trade = TradeDataDB(**trade.dict())
-                        db.add(db_trade)
-                
-                db.commit()
-                print(f"Auto-saved {len(active_trades)} active trades for {account_type} account")
+            await save_trades(account_type, [active_trades[tid] for tid in closed_ids + running_ids])
         except Exception as e:
-            print(f"WARNING: Error auto-saving trades for {account_type}: {e}")
+            # Keep the changes pending so the next save retries them
+            dirty_trade_ids[account_type] |= trade_ids
+            logger.warning("Error auto-saving trades for %s: %s", account_type, e)
+            continue
+        
+        # Remove transferred trades only after the commit succeeded
+        for tid in closed_ids:
+            remove_active_trade(account_type, tid)
+        logger.debug("Auto-saved %s active and %s closed trades for %s account", len(running_ids), len(closed_ids), account_type)
 
 async def update_account_metrics(account_type: str):
-    active_trades = active_trades_store[account_type]
     account_metrics = account_metrics_store[account_type]
     
-    total_margin = 0.0
-    total_pnl = 0.0
-    total_swap = 0.0
-    
-    contract_size = 100000  # Standard MT5 contract size
-    
-    for trade in active_trades.values():
-        if trade.status == TradeStatus.RUNNING:
-            # CORRECT MARGIN: No price multiplier — MT5 uses fixed formula
-            trade.margin_used = (trade.lot_size * contract_size) / DEFAULT_LEVERAGE
-            total_margin += trade.margin_used
-            total_pnl += trade.profit_loss
-            total_swap += trade.swap
+    # Trade totals only change when a trade does; balance-derived fields are recomputed every call
+    totals = trade_totals_cache[account_type]
+    if totals is None:
+        # Reduce over the running rows of the array mirror instead of walking trade objects
+        trade_arrays = active_trade_arrays[account_type]
+        count = trade_arrays.size
+        running = trade_arrays.is_running[:count]
+        total_margin = float(trade_arrays.lot_size[:count][running].sum()) * CONTRACT_SIZE / DEFAULT_LEVERAGE
+        total_pnl = float(trade_arrays.profit_loss[:count][running].sum())
+        total_swap = float(trade_arrays.swap[:count][running].sum())
+        totals = trade_totals_cache[account_type] = (total_margin, total_pnl, total_swap)
+    total_margin, total_pnl, total_swap = totals
+    
+    # Back-to-back calls with nothing changed in between leave every derived field as it is
+    inputs = (totals, account_metrics.balance, account_metrics.deposit)
+    cached = account_metrics_dump_cache.get(account_type)
+    if cached is not None and cached[0] is account_metrics and cached[2] == inputs:
+        return
     
     account_metrics.margin = total_margin
     account_metrics.equity = account_metrics.balance + total_pnl + account_metrics.deposit
@@ -850,24 +1107,32 @@ async def update_account_metrics(account_type: str):
     account_metrics.profit = total_pnl
     account_metrics.total_swap = total_swap
     account_metrics.total_profit_loss = total_pnl
+    account_metrics_dump_cache[account_type] = (account_metrics, account_metrics.model_dump(), inputs)
 
-async def notify_trade_update(account_type: str, trade: TradeData, reason: str):
-    await broadcast_trade_update(account_type, trade)
-    current_time = get_current_time_in_timezone()
-    await manager.broadcast(json.dumps({
+def account_metrics_dump(account_type: str) -> dict:
+    """Dict form of the account's metrics, serialized once per update_account_metrics call"""
+    account_metrics = account_metrics_store[account_type]
+    cached = account_metrics_dump_cache.get(account_type)
+    # A replaced metrics object (reset, account load) hasn't been through update_account_metrics yet
+    if cached is None or cached[0] is not account_metrics:
+        return account_metrics.model_dump()
+    return cached[1]
+
+async def notify_trade_update(account_type: str, trade: TradeData, reason: str, send_price_update: bool = True, timestamp: Optional[str] = None):
+    # The simulation loop passes send_price_update=False and carries the final prices in its per-tick price_updates frame
+    if send_price_update:
+        await broadcast_trade_update(account_type, trade)
+    await manager.broadcast_json({
         "type": f"trade_{trade.status.lower()}",
         "account_type": account_type,
         "trade_id": trade.trade_id,
         "reason": reason,
-        "timestamp": current_time.strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-    }))
+        "timestamp": timestamp or format_timestamp()
+    })
 
-async def broadcast_trade_update(account_type: str, trade: TradeData):
-    account_metrics = account_metrics_store[account_type]
-    current_time = get_current_time_in_timezone()
-    await manager.broadcast(json.dumps({
-        "type": "price_update",
-        "account_type": account_type,
+def trade_price_fields(trade: TradeData) -> dict:
+    """Per-trade fields carried by price_update and price_updates messages"""
+    return {
         "trade_id": trade.trade_id,
         "symbol": trade.symbol,
         "bid": trade.current_buy_price,
@@ -876,10 +1141,42 @@ async def broadcast_trade_update(account_type: str, trade: TradeData):
         "direction": trade.trade_direction,
         "status": trade.status,
         "target_type": trade.target_type,
-        "target_amount": trade.target_amount,
-        "timestamp": current_time.strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}"),
-        "account_metrics": account_metrics.dict()
-    }))
+        "target_amount": trade.target_amount
+    }
+
+async def broadcast_trade_update(account_type: str, trade: TradeData):
+    await manager.broadcast_json({
+        "type": "price_update",
+        "account_type": account_type,
+        **trade_price_fields(trade),
+        "timestamp": format_timestamp(),
+        "account_metrics": account_metrics_dump(account_type)
+    })
+
+async def broadcast_price_updates(account_type: str, updates: List[dict], timestamp: Optional[str] = None):
+    """Send one frame carrying every trade that moved this tick"""
+    await manager.broadcast_json({
+        "type": "price_updates",
+        "account_type": account_type,
+        "trades": updates,
+        "timestamp": timestamp or format_timestamp(),
+        "account_metrics": account_metrics_dump(account_type)
+    })
+
+class AccountCtx:
+    """The current account's in-memory stores, resolved once per request by get_account_ctx"""
+    __slots__ = ("account_type", "trades", "metrics", "pairs", "session_maker")
+
+    def __init__(self, account_type: str):
+        self.account_type = account_type
+        self.trades = active_trades_store[account_type]
+        self.metrics = account_metrics_store[account_type]
+        self.pairs = currency_pair_settings_store[account_type]
+        self.session_maker = account_session_makers[account_type]
+
+async def get_account_ctx() -> AccountCtx:
+    # async so FastAPI resolves it on the event loop rather than in a worker thread
+    return AccountCtx(session_state.get("current_account", "Fast/Acc"))
 
 # API Endpoints
 @app.get("/", response_class=HTMLResponse)
@@ -930,7 +1227,7 @@ async def test_connection():
     return {
         "status": "success",
         "message": "Android app successfully connected to backend!",
-        "server_time": get_current_time_in_timezone().strftime("%Y-%m-%d %H:%M:%S"),
+        "server_time": get_current_time_in_timezone().strftime(DATETIME_FORMAT),
         "available_accounts": ACCOUNT_TYPES,
         "base_url": "http://192.168.10.195:8080/"
     }
@@ -951,7 +1248,7 @@ async def initialize_accounts(request: AccountBalancesRequest):
                 balance=balance, equity=balance, free_margin=balance
             )
     
-    print(f"Initialized accounts: {request.accounts}")
+    logger.info("Initialized accounts: %s", request.accounts)
     
     return {
         "status": "success",
@@ -972,21 +1269,21 @@ async def switch_account(request: SwitchAccountRequest):
     session_state["current_account"] = request.account_type
     session_state["last_switch_time"] = datetime.now(timezone.utc)
     
-    await manager.broadcast(json.dumps({
+    await manager.broadcast_json({
         "type": "account_switched",
         "old_account": old_account,
         "new_account": request.account_type,
-        "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-    }))
+        "timestamp": format_timestamp()
+    })
     
-    print(f"Account switched from {old_account} to {request.account_type}")
+    logger.info("Account switched from %s to %s", old_account, request.account_type)
     
     return {
         "status": "success",
         "message": f"Switched to {request.account_type} account",
         "old_account": old_account,
         "new_account": request.account_type,
-        "account_metrics": account_metrics_store[request.account_type].dict()
+        "account_metrics": account_metrics_store[request.account_type].model_dump()
     }
 
 @app.get("/api/accounts/list")
@@ -1030,34 +1327,35 @@ class TimezoneConfig(BaseModel):
 async def get_timezone():
     return {
         "timezone": SYSTEM_TIMEZONE,
-        "current_time": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}"),
+        "current_time": format_timestamp(),
         "message": "Current timezone configuration"
     }
 
 @app.put("/api/timezone")
 async def set_timezone(config: TimezoneConfig):
-    global SYSTEM_TIMEZONE
+    global SYSTEM_TIMEZONE, SYSTEM_TZ, SYSTEM_TIMESTAMP_FORMAT
     
     try:
-        pytz.timezone(config.timezone)
+        new_tz = pytz.timezone(config.timezone)
         old_timezone = SYSTEM_TIMEZONE
-        SYSTEM_TIMEZONE = config.timezone
+        SYSTEM_TIMEZONE, SYSTEM_TZ = config.timezone, new_tz
+        SYSTEM_TIMESTAMP_FORMAT = f"{DATETIME_FORMAT} {SYSTEM_TIMEZONE}"
         
-        print(f"Timezone changed from {old_timezone} to {SYSTEM_TIMEZONE}")
+        logger.info("Timezone changed from %s to %s", old_timezone, SYSTEM_TIMEZONE)
         
-        await manager.broadcast(json.dumps({
+        await manager.broadcast_json({
             "type": "timezone_changed",
             "old_timezone": old_timezone,
             "new_timezone": SYSTEM_TIMEZONE,
-            "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-        }))
+            "timestamp": format_timestamp()
+        })
         
         return {
             "status": "success",
             "message": f"Timezone changed to {SYSTEM_TIMEZONE}",
             "old_timezone": old_timezone,
             "new_timezone": SYSTEM_TIMEZONE,
-            "current_time": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
+            "current_time": format_timestamp()
         }
     except pytz.exceptions.UnknownTimeZoneError:
         raise HTTPException(status_code=400, detail=f"Invalid timezone: {config.timezone}")
@@ -1081,70 +1379,77 @@ class ResponseModel(BaseModel):
     success: bool = True
 
 @app.get("/api/currency-pairs", response_model=ResponseModel)
-async def get_currency_pairs():
-    account_type = session_state.get("current_account", "Fast/Acc")
-    currency_pair_settings = currency_pair_settings_store[account_type]
+async def get_currency_pairs(ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    currency_pair_settings = ctx.pairs
     return ResponseModel(
-        data={k: v.dict() for k, v in currency_pair_settings.items()},
+        data={k: v.model_dump() for k, v in currency_pair_settings.items()},
         message=f"Currency pairs retrieved for {account_type} account"
     )
 
 @app.get("/api/account-metrics", response_model=AccountMetrics)
-async def get_account_metrics():
-    account_type = session_state.get("current_account", "Fast/Acc")
+async def get_account_metrics(ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
     await update_account_metrics(account_type)
-    return account_metrics_store[account_type]
+    return ctx.metrics
 
 @app.get("/api/trades/active", response_model=List[TradeData])
-async def list_active_trades(status: Optional[TradeStatus] = None, symbol: Optional[str] = None):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
-    trades = list(active_trades.values())
+async def list_active_trades(status: Optional[TradeStatus] = None, symbol: Optional[str] = None, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    if symbol:
+        trades = list(active_trades_by_symbol[account_type].get(symbol, {}).values())
+    else:
+        trades = list(ctx.trades.values())
     if status:
         trades = [t for t in trades if t.status == status]
-    if symbol:
-        trades = [t for t in trades if t.symbol == symbol]
     # Sort by start_time ascending (oldest first)
     trades.sort(key=lambda t: t.start_time, reverse=False)
     return trades
 
+HISTORICAL_STATUSES = (TradeStatus.COMPLETED, TradeStatus.STOPPED)
+
+def query_historical_trades(db: Session, symbol: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[TradeData]:
+    """Closed trades, most recently closed first; limit/offset page through them"""
+    query = db.query(TradeDataDB).filter(TradeDataDB.status.in_(HISTORICAL_STATUSES))
+    if symbol:
+        query = query.filter(TradeDataDB.symbol == symbol)
+    # Sort by end_time descending (most recently closed first), then by start_time descending
+    # Nulls are placed last in SQLite by default with desc()
+    query = query.order_by(TradeDataDB.end_time.desc(), TradeDataDB.start_time.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+    return [trade_from_db_row(t) for t in query.all()]
+
 @app.get("/api/trades/historical", response_model=List[TradeData])
-async def list_historical_trades(symbol: Optional[str] = None):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    SessionLocal = account_session_makers[account_type]
+def list_historical_trades(symbol: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0), ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    SessionLocal = ctx.session_maker
     
     with SessionLocal() as db:
         # CRITICAL: Only return COMPLETED or STOPPED trades (historical trades only)
-        query = db.query(TradeDataDB).filter(
-            TradeDataDB.status.in_([TradeStatus.COMPLETED, TradeStatus.STOPPED])
-        )
-        if symbol:
-            query = query.filter(TradeDataDB.symbol == symbol)
-        # Sort by end_time descending (most recently closed first), then by start_time descending
-        # Nulls are placed last in SQLite by default with desc()
-        query = query.order_by(TradeDataDB.end_time.desc(), TradeDataDB.start_time.desc())
-        trades = query.all()
-        return [TradeData(**{k: getattr(t, k) for k in TradeData.__fields__}) for t in trades]
+        return query_historical_trades(db, symbol, limit, offset)
 
 @app.get("/api/trades/{trade_id}", response_model=TradeData)
-async def get_trade(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def get_trade(trade_id: str, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     if trade_id in active_trades:
         return active_trades[trade_id]
     
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
-        trade = db.query(TradeDataDB).filter(TradeDataDB.trade_id == trade_id).first()
+        trade = db.get(TradeDataDB, trade_id)
         if trade:
-            return TradeData(**{k: getattr(trade, k) for k in TradeData.__fields__})
+            return trade_from_db_row(trade)
     raise HTTPException(status_code=404, detail="Trade not found")
 
 @app.get("/api/trades/{trade_id}/details")
-async def get_trade_details(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def get_trade_details(trade_id: str, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     if trade_id in active_trades:
         trade = active_trades[trade_id]
@@ -1152,46 +1457,56 @@ async def get_trade_details(trade_id: str):
     
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
-        trade = db.query(TradeDataDB).filter(TradeDataDB.trade_id == trade_id).first()
+        trade = db.get(TradeDataDB, trade_id)
         if trade:
-            return {"trade": TradeData(**{k: getattr(trade, k) for k in TradeData.__fields__}), "is_active": False, "account_type": account_type, "message": "Historical trade details retrieved"}
+            return {"trade": trade_from_db_row(trade), "is_active": False, "account_type": account_type, "message": "Historical trade details retrieved"}
     raise HTTPException(status_code=404, detail="Trade not found")
 
-@app.get("/api/summary/trades")
-async def get_trades_summary():
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
-    account_metrics = account_metrics_store[account_type]
-    
-    active_trade_list = list(active_trades.values())
-    
-    SessionLocal = account_session_makers[account_type]
-    with SessionLocal() as db:
+def query_trade_history_totals(db: Session) -> tuple:
+    """Count, completed, profitable, losing, P&L and swap over the whole closed-trade history"""
+    # Totals over the whole history are aggregated in SQL, so paging all_trades doesn't change them
+    return tuple(db.query(
+        func.count(),
+        func.count(case((TradeDataDB.status == TradeStatus.COMPLETED, 1))),
+        func.count(case((TradeDataDB.profit_loss > 0, 1))),
+        func.count(case((TradeDataDB.profit_loss < 0, 1))),
+        func.coalesce(func.sum(TradeDataDB.profit_loss), 0.0),
+        func.coalesce(func.sum(TradeDataDB.swap), 0.0)
+    ).filter(TradeDataDB.status.in_(HISTORICAL_STATUSES)).one())
+
+def load_trade_history_totals(account_type: str) -> tuple:
+    """Blocking, run in a thread"""
+    with account_session_makers[account_type]() as db:
+        return query_trade_history_totals(db)
+
+def load_trade_history_summary(account_type: str, limit: Optional[int], offset: int):
+    """Aggregate the whole closed-trade history and load one page of it; blocking, run in a thread"""
+    with account_session_makers[account_type]() as db:
         # Sort historical trades by end_time descending (most recently closed first)
         # CRITICAL: Only get COMPLETED or STOPPED trades
-        historical_trades_db = db.query(TradeDataDB).filter(
-            TradeDataDB.status.in_([TradeStatus.COMPLETED, TradeStatus.STOPPED])
-        ).order_by(TradeDataDB.end_time.desc(), TradeDataDB.start_time.desc()).all()
-        historical_trade_list = [TradeData(**{k: getattr(t, k) for k in TradeData.__fields__}) for t in historical_trades_db]
-    
-    # Sort active trades by start_time ascending (oldest first)
-    active_trade_list.sort(key=lambda t: t.start_time, reverse=False)
-    
-    all_trades = active_trade_list + historical_trade_list
+        return query_trade_history_totals(db), query_historical_trades(db, limit=limit, offset=offset)
+
+def build_trades_summary(account_type: str, history: tuple, active_trade_list: List[TradeData]) -> dict:
+    """Trade and financial summaries from the history totals plus the trades still in memory"""
+    account_metrics = account_metrics_store[account_type]
+    historical_count, historical_completed, historical_profitable, historical_losing, historical_pnl, historical_swap = history
     
-    total_trades = len(all_trades)
-    running_trades = len([t for t in all_trades if t.status == TradeStatus.RUNNING])
-    completed_trades = len([t for t in all_trades if t.status == TradeStatus.COMPLETED])
-    stopped_trades = len([t for t in all_trades if t.status == TradeStatus.STOPPED])
+    total_trades = len(active_trade_list) + historical_count
+    running_trades = len([t for t in active_trade_list if t.status == TradeStatus.RUNNING])
+    completed_trades = historical_completed + len([t for t in active_trade_list if t.status == TradeStatus.COMPLETED])
+    stopped_trades = historical_count - historical_completed + len([t for t in active_trade_list if t.status == TradeStatus.STOPPED])
     
-    completed_profits = [t.profit_loss for t in all_trades if t.status in [TradeStatus.COMPLETED, TradeStatus.STOPPED]]
-    total_realized_pnl = sum(completed_profits) if completed_profits else 0.0
-    current_unrealized_pnl = sum([t.profit_loss for t in active_trade_list])
+    # Closed trades still waiting in the active store count as realized, as they would once persisted
+    closing_trades = [t for t in active_trade_list if t.status in HISTORICAL_STATUSES]
+    closing_profits = [t.profit_loss for t in closing_trades]
+    closed_count = historical_count + len(closing_profits)
+    total_realized_pnl = historical_pnl + sum(closing_profits)
+    current_unrealized_pnl = account_metrics.profit
     
-    profitable_trades = len([p for p in completed_profits if p > 0])
-    losing_trades = len([p for p in completed_profits if p < 0])
-    win_rate = (profitable_trades / len(completed_profits) * 100) if completed_profits else 0.0
-    total_swap_all = sum([t.swap for t in all_trades])
+    profitable_trades = historical_profitable + len([p for p in closing_profits if p > 0])
+    losing_trades = historical_losing + len([p for p in closing_profits if p < 0])
+    win_rate = (profitable_trades / closed_count * 100) if closed_count else 0.0
+    total_swap_all = historical_swap + account_metrics.total_swap + sum([t.swap for t in closing_trades])
     
     return {
         "account_type": account_type,
@@ -1213,10 +1528,57 @@ async def get_trades_summary():
             "free_margin": round(account_metrics.free_margin, 2),
             "margin_level_percentage": round(account_metrics.margin_level, 2)
         },
-        "all_trades": all_trades,
         "message": f"Retrieved {total_trades} total trades from {account_type} account"
     }
 
+def sorted_active_trades(account_type: str) -> List[TradeData]:
+    # Sort active trades by start_time ascending (oldest first)
+    return sorted(active_trades_store[account_type].values(), key=lambda t: t.start_time)
+
+@app.get("/api/summary/trades")
+async def get_trades_summary(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0)):
+    account_type = session_state.get("current_account", "Fast/Acc")
+    history, historical_trade_list = await asyncio.to_thread(load_trade_history_summary, account_type, limit, offset)
+    
+    # Running-trade P&L and swap come from the cached metric totals
+    await update_account_metrics(account_type)
+    active_trade_list = sorted_active_trades(account_type)
+    
+    summary = build_trades_summary(account_type, history, active_trade_list)
+    summary["all_trades"] = active_trade_list + historical_trade_list
+    return summary
+
+@app.get("/api/summary/trades/stats")
+async def get_trades_summary_stats():
+    """Same totals as /api/summary/trades without the trade list"""
+    account_type = session_state.get("current_account", "Fast/Acc")
+    history = await asyncio.to_thread(load_trade_history_totals, account_type)
+    await update_account_metrics(account_type)
+    return build_trades_summary(account_type, history, sorted_active_trades(account_type))
+
+def stream_trade_rows(account_type: str, active_rows: List[dict], limit: Optional[int], offset: int):
+    """Newline-delimited JSON: active trades first, then closed trades read off a server-side cursor"""
+    for row in active_rows:
+        yield orjson.dumps(row) + b"\n"
+    statement = (
+        select(*[getattr(TradeDataDB, column) for column in TRADE_COLUMNS])
+        .where(TradeDataDB.status.in_(HISTORICAL_STATUSES))
+        .order_by(TradeDataDB.end_time.desc(), TradeDataDB.start_time.desc())
+        .limit(limit).offset(offset)
+        .execution_options(stream_results=True, yield_per=500)
+    )
+    with account_session_makers[account_type]() as db:
+        for row in db.execute(statement):
+            yield orjson.dumps(row._asdict()) + b"\n"
+
+@app.get("/api/summary/trades/list")
+async def stream_trades_list(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0)):
+    """Active trades plus a page of closed trades, one JSON object per line"""
+    account_type = session_state.get("current_account", "Fast/Acc")
+    # Snapshot the in-memory trades on the loop; StreamingResponse iterates the generator in a worker thread
+    active_rows = [trade.__dict__.copy() for trade in sorted_active_trades(account_type)]
+    return StreamingResponse(stream_trade_rows(account_type, active_rows, limit, offset), media_type="application/x-ndjson")
+
 @app.get("/api/sum-in-exness")
 async def sum_in_exness():
     """
@@ -1232,7 +1594,7 @@ async def sum_in_exness():
     return {
         "account_type": account_type,
         "currency_pair_stats": stats,
-        "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}"),
+        "timestamp": format_timestamp(),
         "message": "Sum in Exness statistics retrieved successfully"
     }
 
@@ -1295,19 +1657,21 @@ def calculate_exness_stats(account_type: str, include_completed_today: bool = Tr
     return result
 
 
-async def broadcast_exness_stats(account_type: str):
+async def broadcast_exness_stats(account_type: str, timestamp: Optional[str] = None):
     """Broadcast real-time Exness stats via WebSocket"""
+    if not manager.active_connections:
+        return
     stats = calculate_exness_stats(account_type, include_completed_today=False)
     
-    await manager.broadcast(json.dumps({
+    await manager.broadcast_json({
         "type": "exness_stats_update",
         "account_type": account_type,
         "currency_pair_stats": stats,
-        "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-    }))
+        "timestamp": timestamp or format_timestamp()
+    })
 
 @app.get("/api/profits-losses-by-date")
-async def get_profits_losses_by_date():
+def get_profits_losses_by_date():
     """
     Returns all profits and losses attained by completed trades, grouped by date in chronological order.
     This is recalculated whenever admin updates completed trades in the database.
@@ -1376,16 +1740,16 @@ async def get_profits_losses_by_date():
                 "net_profit_loss": round(overall_net, 2),
                 "total_trades": total_trades
             },
-            "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}"),
+            "timestamp": format_timestamp(),
             "message": "Profits and losses by date retrieved successfully"
         }
 
 
 @app.get("/api/summary/account")
-async def get_account_summary():
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
-    account_metrics = account_metrics_store[account_type]
+async def get_account_summary(ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
+    account_metrics = ctx.metrics
     
     await update_account_metrics(account_type)
     active_trade_count = len(active_trades)
@@ -1393,7 +1757,7 @@ async def get_account_summary():
     
     return {
         "account_type": account_type,
-        "account_metrics": account_metrics.dict(),
+        "account_metrics": account_metrics_dump(account_type),
         "trading_summary": {
             "active_trades_count": active_trade_count,
             "total_lot_size_active": round(total_lot_size, 2),
@@ -1412,16 +1776,16 @@ class UpdateTradeRequest(BaseModel):
     status: Optional[TradeStatus] = Field(None, description="Updated trade status")
 
 @app.put("/api/trades/{trade_id}/update")
-async def update_historical_trade(trade_id: str, request: UpdateTradeRequest):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def update_historical_trade(trade_id: str, request: UpdateTradeRequest, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     if trade_id in active_trades:
         raise HTTPException(status_code=400, detail="Cannot update active trade. Close the trade first.")
     
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
-        trade_db = db.query(TradeDataDB).filter(TradeDataDB.trade_id == trade_id).first()
+        trade_db = db.get(TradeDataDB, trade_id)
         if not trade_db:
             raise HTTPException(status_code=404, detail="Trade not found in database")
         
@@ -1488,48 +1852,38 @@ async def update_historical_trade(trade_id: str, request: UpdateTradeRequest):
         db.commit()
         db.refresh(trade_db)
         
-        updated_trade = TradeData(**{k: getattr(trade_db, k) for k in TradeData.__fields__})
+        updated_trade = trade_from_db_row(trade_db)
         
-        print(f"Trade {trade_id} updated in {account_type}: {', '.join(updates)}")
+        logger.info("Trade %s updated in %s: %s", trade_id, account_type, ', '.join(updates))
         
-        await manager.broadcast(json.dumps({
+        manager.queue_event({
             "type": "trade_database_updated",
             "account_type": account_type,
             "trade_id": trade_id,
             "updates": updates,
-            "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-        }))
+            "timestamp": format_timestamp()
+        })
         
         return {"status": "success", "message": f"Trade {trade_id} updated successfully in {account_type}", "updates_applied": updates, "trade": updated_trade}
 
 @app.post("/api/trades/{trade_id}/recalculate")
-async def recalculate_trade_pnl(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def recalculate_trade_pnl(trade_id: str, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     if trade_id in active_trades:
         raise HTTPException(status_code=400, detail="Cannot recalculate active trade")
     
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
-        trade_db = db.query(TradeDataDB).filter(TradeDataDB.trade_id == trade_id).first()
+        trade_db = db.get(TradeDataDB, trade_id)
         if not trade_db:
             raise HTTPException(status_code=404, detail="Trade not found")
         
         if trade_db.closing_price is None:
             raise HTTPException(status_code=400, detail="Closing price must be set before recalculation")
         
-        if trade_db.trade_direction == TradeDirection.BUY:
-            price_diff = trade_db.closing_price - trade_db.entry_price
-        else:
-            price_diff = trade_db.entry_price - trade_db.closing_price
-        
-        calculated_pnl = price_diff * trade_db.lot_size * 100000
-        
-        if trade_db.symbol.startswith("USD"):
-            calculated_pnl /= trade_db.closing_price
-        
-        calculated_pnl -= (trade_db.commission + trade_db.swap)
+        calculated_pnl = float(compute_pnl(trade_db.closing_price, trade_db.entry_price, trade_db.lot_size, trade_db.trade_direction == TradeDirection.BUY, trade_db.symbol in USD_BASE_SYMBOLS, trade_db.commission, trade_db.swap))
         
         old_pnl = trade_db.profit_loss
         trade_db.profit_loss = calculated_pnl
@@ -1537,45 +1891,77 @@ async def recalculate_trade_pnl(trade_id: str):
         db.commit()
         db.refresh(trade_db)
         
-        print(f"Trade {trade_id} recalculated in {account_type}: P&L {old_pnl:.2f} → {calculated_pnl:.2f}")
+        logger.info("Trade %s recalculated in %s: P&L %.2f → %.2f", trade_id, account_type, old_pnl, calculated_pnl)
         
-        updated_trade = TradeData(**{k: getattr(trade_db, k) for k in TradeData.__fields__})
-        await manager.broadcast(json.dumps({
+        updated_trade = trade_from_db_row(trade_db)
+        manager.queue_event({
             "type": "trade_database_updated",
             "account_type": account_type,
             "trade_id": trade_id,
             "updates": ["profit_loss"],
-            "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}"),
-            "trade": updated_trade.dict()
-        }))
+            "timestamp": format_timestamp(),
+            "trade": updated_trade.model_dump()
+        })
         
         return {"status": "success", "message": "P&L recalculated successfully", "account_type": account_type, "old_pnl": round(old_pnl, 2), "new_pnl": round(calculated_pnl, 2), "trade_id": trade_id, "trade": updated_trade}
 
 @app.delete("/api/trades/{trade_id}")
-async def delete_trade(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def delete_trade(trade_id: str, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     if trade_id in active_trades:
         raise HTTPException(status_code=400, detail="Cannot delete active trade. Close it first.")
     
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
-        trade_db = db.query(TradeDataDB).filter(TradeDataDB.trade_id == trade_id).first()
-        if not trade_db:
+        # One Core DELETE ... RETURNING instead of loading the ORM row and deleting it
+        deleted = db.execute(
+            delete(TradeDataDB).where(TradeDataDB.trade_id == trade_id)
+            .returning(TradeDataDB.symbol, TradeDataDB.entry_price, TradeDataDB.profit_loss)
+        ).first()
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Trade not found")
         
-        trade_info = {"symbol": trade_db.symbol, "entry_price": trade_db.entry_price, "profit_loss": trade_db.profit_loss}
+        trade_info = deleted._asdict()
         
-        db.delete(trade_db)
         db.commit()
         
-        print(f"Trade {trade_id} deleted from {account_type}: {trade_info}")
+        logger.info("Trade %s deleted from %s: %s", trade_id, account_type, trade_info)
         
-        await manager.broadcast(json.dumps({"type": "trade_deleted", "account_type": account_type, "trade_id": trade_id, "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")}))
+        manager.queue_event({"type": "trade_deleted", "account_type": account_type, "trade_id": trade_id, "timestamp": format_timestamp()})
         
         return {"status": "success", "message": f"Trade {trade_id} permanently deleted from {account_type}", "deleted_trade_info": trade_info}
 
+class BulkDeleteRequest(BaseModel):
+    trade_ids: List[str]
+
+@app.post("/api/trades/bulk-delete")
+async def bulk_delete_trades(request: BulkDeleteRequest, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    
+    # Active trades are skipped, as the single delete refuses them; everything else goes in one DELETE per chunk
+    requested_ids = list(dict.fromkeys(request.trade_ids))
+    active_ids = [trade_id for trade_id in requested_ids if trade_id in ctx.trades]
+    candidate_ids = [trade_id for trade_id in requested_ids if trade_id not in ctx.trades]
+    deleted_ids = []
+    with ctx.session_maker() as db:
+        for index in range(0, len(candidate_ids), BULK_UPDATE_CHUNK):
+            deleted_ids.extend(db.execute(
+                delete(TradeDataDB).where(TradeDataDB.trade_id.in_(candidate_ids[index:index + BULK_UPDATE_CHUNK]))
+                .returning(TradeDataDB.trade_id)
+            ).scalars())
+        db.commit()
+    
+    deleted = set(deleted_ids)
+    not_found_ids = [trade_id for trade_id in candidate_ids if trade_id not in deleted]
+    logger.info("Bulk delete performed in %s: %s deleted, %s active, %s not found", account_type, len(deleted_ids), len(active_ids), len(not_found_ids))
+    
+    if deleted_ids:
+        manager.queue_event({"type": "trades_deleted", "account_type": account_type, "trade_ids": deleted_ids, "timestamp": format_timestamp()})
+    
+    return {"status": "completed", "account_type": account_type, "message": f"Bulk delete completed: {len(deleted_ids)} deleted", "deleted_trade_ids": deleted_ids, "active_trade_ids": active_ids, "not_found_trade_ids": not_found_ids}
+
 class BulkUpdateItem(BaseModel):
     trade_id: str
     updates: UpdateTradeRequest
@@ -1584,70 +1970,92 @@ class BulkUpdateRequest(BaseModel):
     trades: List[BulkUpdateItem]
 
 @app.post("/api/trades/bulk-update")
-async def bulk_update_trades(request: BulkUpdateRequest):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+def bulk_update_trades(request: BulkUpdateRequest, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     results = []
     errors = []
     
+    # One snapshot of the active conflicts decides both what is fetched and what is rejected,
+    # even if the simulation loop opens or closes trades while this runs in a worker thread
+    requested_ids = {item.trade_id for item in request.trades}
+    conflicts = requested_ids & active_trades.keys()
+    # Load the columns the updates depend on for every other requested trade in one query per chunk
+    trade_ids = list(requested_ids - conflicts)
     SessionLocal = account_session_makers[account_type]
     with SessionLocal() as db:
+        current = {}
+        for index in range(0, len(trade_ids), BULK_UPDATE_CHUNK):
+            rows = db.execute(
+                select(TradeDataDB.trade_id, TradeDataDB.start_time, TradeDataDB.end_time, TradeDataDB.closing_price, TradeDataDB.status)
+                .where(TradeDataDB.trade_id.in_(trade_ids[index:index + BULK_UPDATE_CHUNK]))
+            )
+            current.update((row.trade_id, row._asdict()) for row in rows)
+        
+        # Changed columns per trade, applied with one executemany UPDATE keyed on trade_id
+        changes: Dict[str, dict] = {}
         for item in request.trades:
             try:
-                if item.trade_id in active_trades:
+                if item.trade_id in conflicts:
                     errors.append({"trade_id": item.trade_id, "error": "Trade is active, cannot update"})
                     continue
                 
-                trade_db = db.query(TradeDataDB).filter(TradeDataDB.trade_id == item.trade_id).first()
-                if not trade_db:
+                trade_db = current.get(item.trade_id)
+                if trade_db is None:
                     errors.append({"trade_id": item.trade_id, "error": "Trade not found"})
                     continue
                 
+                updates = {}
                 updates_applied = []
                 if item.updates.entry_price is not None and item.updates.entry_price > 0:
-                    trade_db.entry_price = item.updates.entry_price
+                    updates["entry_price"] = item.updates.entry_price
                     updates_applied.append("entry_price")
                 if item.updates.closing_price is not None and item.updates.closing_price > 0:
-                    trade_db.closing_price = item.updates.closing_price
+                    updates["closing_price"] = item.updates.closing_price
                     updates_applied.append("closing_price")
                 if item.updates.start_time is not None:
-                    if item.updates.start_time.tzinfo:
-                        trade_db.start_time = item.updates.start_time.replace(tzinfo=None)
-                    else:
-                        trade_db.start_time = item.updates.start_time
+                    updates["start_time"] = item.updates.start_time.replace(tzinfo=None)
                     updates_applied.append("start_time")
                 if item.updates.end_time is not None:
-                    if item.updates.end_time.tzinfo:
-                        trade_db.end_time = item.updates.end_time.replace(tzinfo=None)
-                    else:
-                        trade_db.end_time = item.updates.end_time
+                    updates["end_time"] = item.updates.end_time.replace(tzinfo=None)
                     updates_applied.append("end_time")
-                elif trade_db.end_time is None and trade_db.status in [TradeStatus.COMPLETED, TradeStatus.STOPPED]:
+                elif trade_db["end_time"] is None and trade_db["status"] in [TradeStatus.COMPLETED, TradeStatus.STOPPED]:
                     # Auto-fix missing end_time for completed trades
-                    trade_db.end_time = trade_db.start_time
+                    updates["end_time"] = updates.get("start_time", trade_db["start_time"])
                     updates_applied.append("end_time (auto-fixed)")
                 if item.updates.lot_size is not None and item.updates.lot_size > 0:
-                    trade_db.lot_size = item.updates.lot_size
+                    updates["lot_size"] = item.updates.lot_size
                     updates_applied.append("lot_size")
                 if item.updates.profit_loss is not None:
-                    trade_db.profit_loss = item.updates.profit_loss
+                    updates["profit_loss"] = item.updates.profit_loss
                     updates_applied.append("profit_loss")
                 if item.updates.status is not None:
-                    trade_db.status = item.updates.status
+                    updates["status"] = item.updates.status
                     updates_applied.append("status")
-                elif (trade_db.end_time is not None or trade_db.closing_price is not None) and trade_db.status != TradeStatus.COMPLETED:
-                    trade_db.status = TradeStatus.COMPLETED
+                elif (updates.get("end_time", trade_db["end_time"]) is not None or updates.get("closing_price", trade_db["closing_price"]) is not None) and trade_db["status"] != TradeStatus.COMPLETED:
+                    updates["status"] = TradeStatus.COMPLETED
                     updates_applied.append("status")
                 
+                # Later items for the same trade see the earlier ones, as they did when updating ORM rows in turn
+                trade_db.update((key, value) for key, value in updates.items() if key in trade_db)
+                changes.setdefault(item.trade_id, {"trade_id": item.trade_id}).update(updates)
                 results.append({"trade_id": item.trade_id, "status": "success", "updates_applied": updates_applied})
                 
             except Exception as e:
                 errors.append({"trade_id": item.trade_id, "error": str(e)})
         
+        # Group mappings by changed columns so each executemany shares one statement
+        mappings_by_columns: Dict[Tuple[str, ...], List[dict]] = {}
+        for mapping in changes.values():
+            if len(mapping) > 1:
+                mappings_by_columns.setdefault(tuple(sorted(mapping)), []).append(mapping)
+        for mappings in mappings_by_columns.values():
+            for index in range(0, len(mappings), BULK_UPDATE_CHUNK):
+                db.execute(update(TradeDataDB), mappings[index:index + BULK_UPDATE_CHUNK])
         db.commit()
     
-    print(f"Bulk update performed in {account_type}: {len(results)} succeeded, {len(errors)} failed")
+    logger.info("Bulk update performed in %s: %s succeeded, %s failed", account_type, len(results), len(errors))
     
     return {"status": "completed", "account_type": account_type, "message": f"Bulk update completed: {len(results)} successful, {len(errors)} failed", "successful_updates": results, "errors": errors}
 
@@ -1662,44 +2070,45 @@ async def verify_license(request: LicenseKeyRequest):
         raise HTTPException(status_code=400, detail="Invalid license key")
 
 @app.put("/api/currency-pairs/{symbol}", response_model=CurrencyPairConfig)
-async def update_currency_pair(symbol: str, settings: CurrencyPairConfig):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    currency_pair_settings = currency_pair_settings_store[account_type]
+async def update_currency_pair(symbol: str, settings: CurrencyPairConfig, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    currency_pair_settings = ctx.pairs
     
     if symbol not in currency_pair_settings:
         raise HTTPException(status_code=404, detail=f"Currency pair {symbol} not found")
     currency_pair_settings[symbol] = settings
-    print(f"{symbol} settings updated in {account_type}")
+    symbol_params_store[account_type] = SymbolParams(currency_pair_settings)
+    logger.info("%s settings updated in %s", symbol, account_type)
     return settings
 
 class SetBalanceRequest(BaseModel):
     balance: float = Field(..., gt=0, description="New account balance")
 
 @app.put("/api/account/balance", response_model=AccountMetrics)
-async def set_account_balance(request: SetBalanceRequest):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    account_metrics = account_metrics_store[account_type]
+async def set_account_balance(request: SetBalanceRequest, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    account_metrics = ctx.metrics
     
     account_metrics.balance = request.balance
     await update_account_metrics(account_type)
-    print(f"{account_type} balance set to {request.balance}")
+    logger.info("%s balance set to %s", account_type, request.balance)
     return account_metrics
 
 class DepositRequest(BaseModel):
     amount: float = Field(0.0, ge=0.0, description="Deposit amount to add to the current account balance")
 
 @app.post("/api/account/deposit")
-async def deposit(request: DepositRequest = DepositRequest()):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    account_metrics = account_metrics_store[account_type]
+async def deposit(request: DepositRequest = DepositRequest(), ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    account_metrics = ctx.metrics
     
     old_balance = account_metrics.balance
     new_balance = old_balance + request.amount
     account_metrics.balance = new_balance
     account_metrics.deposit = request.amount
     await update_account_metrics(account_type)
-    await manager.broadcast(json.dumps({"type": "deposit", "account_type": account_type, "amount": request.amount, "old_balance": old_balance, "new_balance": new_balance, "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")}))
-    print(f"Deposited {request.amount:.2f} to {account_type}: {old_balance:.2f} -> {new_balance:.2f}")
+    manager.queue_event({"type": "deposit", "account_type": account_type, "amount": request.amount, "old_balance": old_balance, "new_balance": new_balance, "timestamp": format_timestamp()})
+    logger.info("Deposited %.2f to %s: %.2f -> %.2f", request.amount, account_type, old_balance, new_balance)
     return {"status": "success", "account_type": account_type, "message": f"Deposited {request.amount:.2f}", "old_balance": old_balance, "new_balance": new_balance}
 
 class StartTradeRequest(BaseModel):
@@ -1714,11 +2123,10 @@ class UpdateTradeTargetRequest(BaseModel):
     target_amount: float = Field(..., gt=0, description="Target profit or loss in USD")
 
 @app.post("/api/trades/start/{symbol}")
-async def start_trade(symbol: str, request: StartTradeRequest):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    currency_pair_settings = currency_pair_settings_store[account_type]
-    active_trades = active_trades_store[account_type]
-    account_metrics = account_metrics_store[account_type]
+async def start_trade(symbol: str, request: StartTradeRequest, ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    currency_pair_settings = ctx.pairs
+    account_metrics = ctx.metrics
     
     if symbol not in currency_pair_settings:
         raise HTTPException(status_code=404, detail=f"Currency pair {symbol} not found")
@@ -1752,18 +2160,11 @@ async def start_trade(symbol: str, request: StartTradeRequest):
     if target_amount <= 0:
         raise HTTPException(status_code=400, detail="Target amount must be positive")
 
-    if symbol.startswith("USD"):
-        price_diff = target_amount * entry_price / (trade_lot_size * 100000)
-    else:
-        price_diff = target_amount / (trade_lot_size * 100000)
-    if direction == TradeDirection.BUY:
-        target_price = entry_price + price_diff if target_type == TargetType.PROFIT else entry_price - price_diff
-    else:
-        target_price = entry_price - price_diff if target_type == TargetType.PROFIT else entry_price + price_diff
+    contract = trade_lot_size * CONTRACT_SIZE
+    target_price = compute_target_price(entry_price, target_amount, contract, symbol in USD_BASE_SYMBOLS, direction == TradeDirection.BUY, target_type == TargetType.PROFIT)
 
     # === CORRECT MT5 MARGIN CALCULATION (NO PRICE MULTIPLIER!) ===
-    contract_size = 100000
-    required_margin = (trade_lot_size * contract_size) / DEFAULT_LEVERAGE
+    required_margin = contract / DEFAULT_LEVERAGE
 
     # Update metrics to get accurate free margin
     await update_account_metrics(account_type)
@@ -1780,90 +2181,76 @@ async def start_trade(symbol: str, request: StartTradeRequest):
         raise HTTPException(status_code=400, detail="Minimum account balance: $20")
 
     # Generate trade ID: 10 random digits (URL-safe format)
-    # Ensure uniqueness by checking against active trades and database
-    max_attempts = 10
+    # Ensure uniqueness by checking a batch of candidates against active trades and one database query
+    # One C-level draw per id; random() carries 53 bits, so scaling to 10 digits stays effectively uniform.
+    # Another batch is drawn in the practically impossible case that all of them are taken,
+    # so every id handed out has been checked
     trade_id = None
-    SessionLocal = account_session_makers[account_type]
-    for attempt in range(max_attempts):
-        candidate_id = ''.join([str(random.randint(0, 9)) for _ in range(10)])
-        # Check if ID already exists in active trades or database
-        if candidate_id not in active_trades:
-            with SessionLocal() as db:
-                existing = db.query(TradeDataDB).filter(TradeDataDB.trade_id == candidate_id).first()
-                if not existing:
-                    trade_id = candidate_id
-                    break
-    
-    if trade_id is None:
-        # Fallback to timestamp-based ID if all random attempts failed
-        trade_id = str(int(datetime.now().timestamp() * 1000))[-10:]
+    with account_session_makers[account_type]() as db:
+        while trade_id is None:
+            candidates = [f"{int(random.random() * 10_000_000_000):010d}" for _ in range(TRADE_ID_CANDIDATES)]
+            candidates = [candidate_id for candidate_id in candidates if candidate_id not in trade_index]
+            taken = {row[0] for row in db.query(TradeDataDB.trade_id).filter(TradeDataDB.trade_id.in_(candidates))}
+            trade_id = next((candidate_id for candidate_id in candidates if candidate_id not in taken), None)
     
     # Store start_time WITHOUT timezone for database compatibility
     current_time = get_current_time_in_timezone().replace(tzinfo=None)
-    trade_data = TradeData(trade_id=trade_id, symbol=symbol, entry_price=entry_price, current_buy_price=current_buy_price, current_sell_price=current_sell_price, start_time=current_time, status=TradeStatus.RUNNING, target_price=target_price, target_type=target_type, target_amount=target_amount, lot_size=trade_lot_size, trade_direction=direction, commission=trade_lot_size * COMMISSION * 100000, bias_factor=0.0)
-    active_trades[trade_id] = trade_data
+    trade_data = TradeData(trade_id=trade_id, symbol=symbol, entry_price=entry_price, current_buy_price=current_buy_price, current_sell_price=current_sell_price, start_time=current_time, status=TradeStatus.RUNNING, target_price=target_price, target_type=target_type, target_amount=target_amount, lot_size=trade_lot_size, trade_direction=direction, commission=contract * COMMISSION, bias_factor=0.0)
+    add_active_trade(account_type, trade_data)
     await update_account_metrics(account_type)
-    print(f"Trade {trade_id} started in {account_type} at {current_time}")
-    return {"status": "success", "account_type": account_type, "trade_id": trade_id, "symbol": symbol, "direction": direction, "message": f"{direction} trade started for {symbol}", "start_time": current_time.strftime("%Y-%m-%d %H:%M:%S")}
+    logger.info("Trade %s started in %s at %s", trade_id, account_type, current_time)
+    return {"status": "success", "account_type": account_type, "trade_id": trade_id, "symbol": symbol, "direction": direction, "message": f"{direction} trade started for {symbol}", "start_time": current_time.strftime(DATETIME_FORMAT)}
 
 @app.put("/api/trades/{trade_id}/update-target")
 async def update_trade_target(trade_id: str, request: UpdateTradeTargetRequest):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
-    
-    if trade_id not in active_trades:
+    entry = trade_index.get(trade_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Trade not found")
-    trade = active_trades[trade_id]
+    account_type, trade = entry
     if trade.status != TradeStatus.RUNNING:
         raise HTTPException(status_code=400, detail=f"Trade is already {trade.status}")
 
     target_amount = request.target_amount
     target_type = request.target_type
 
-    if trade.symbol.startswith("USD"):
-        price_diff = target_amount * trade.entry_price / (trade.lot_size * 100000)
-    else:
-        price_diff = target_amount / (trade.lot_size * 100000)
-    if trade.trade_direction == TradeDirection.BUY:
-        target_price = trade.entry_price + price_diff if target_type == TargetType.PROFIT else trade.entry_price - price_diff
-    else:
-        target_price = trade.entry_price - price_diff if target_type == TargetType.PROFIT else trade.entry_price + price_diff
-
-    trade.target_price = target_price
+    trade.target_price = compute_target_price(trade.entry_price, target_amount, trade.lot_size * CONTRACT_SIZE, trade.is_usd_base, trade.trade_direction == TradeDirection.BUY, target_type == TargetType.PROFIT)
     trade.target_type = target_type
     trade.target_amount = target_amount
+    active_trade_arrays[account_type].update(trade)
+    mark_trades_dirty(account_type, (trade_id,))
     await update_account_metrics(account_type)
-    print(f"Trade {trade_id} updated in {account_type}")
+    logger.info("Trade %s updated in %s", trade_id, account_type)
     return {"status": "success", "account_type": account_type, "trade_id": trade_id, "message": f"Trade updated"}
 
 @app.post("/api/trades/{trade_id}/finish")
 async def finish_trade(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
-    
-    if trade_id not in active_trades:
+    entry = trade_index.get(trade_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Trade not found")
-    trade = active_trades[trade_id]
+    account_type, trade = entry
     if trade.status != TradeStatus.RUNNING:
         raise HTTPException(status_code=400, detail=f"Trade is already {trade.status}")
     
     trade.bias_factor = 0.05
-    await manager.broadcast(json.dumps({"type": "trade_bias_applied", "account_type": account_type, "trade_id": trade_id, "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")}))
-    print(f"Trade {trade_id} biased in {account_type}")
+    active_trade_arrays[account_type].update(trade)
+    mark_trades_dirty(account_type, (trade_id,))
+    manager.queue_event({"type": "trade_bias_applied", "account_type": account_type, "trade_id": trade_id, "timestamp": format_timestamp()})
+    logger.info("Trade %s biased in %s", trade_id, account_type)
     return {"status": "success", "account_type": account_type, "message": f"Trade biased to reach target faster"}
 
 @app.post("/api/trades/{trade_id}/close")
 async def close_trade(trade_id: str):
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+    entry = trade_index.get(trade_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    account_type, trade = entry
     account_metrics = account_metrics_store[account_type]
     
-    if trade_id not in active_trades:
-        raise HTTPException(status_code=404, detail="Trade not found")
-    trade = active_trades[trade_id]
     if trade.status != TradeStatus.RUNNING:
         raise HTTPException(status_code=400, detail=f"Trade is already {trade.status}")
     trade.status = TradeStatus.COMPLETED
+    active_trade_arrays[account_type].mark_closed(trade_id)
+    mark_trades_dirty(account_type, (trade_id,))
     # Store end_time WITHOUT timezone for database
     trade.end_time = get_current_time_in_timezone().replace(tzinfo=None)
     trade.closing_price = trade.current_buy_price if trade.trade_direction == TradeDirection.BUY else trade.current_sell_price
@@ -1875,50 +2262,55 @@ async def close_trade(trade_id: str):
     await transfer_completed_trades_to_database(account_type, trade_id)
     
     # Remove from active trades if still there (should be removed by transfer_completed_trades_to_database)
-    if trade_id in active_trades:
-        del active_trades[trade_id]
-    print(f"Trade {trade_id} closed in {account_type}")
+    remove_active_trade(account_type, trade_id)
+    logger.info("Trade %s closed in %s", trade_id, account_type)
     return {"status": "success", "account_type": account_type, "message": f"Trade closed successfully"}
 
 @app.post("/api/reset")
-async def reset_account():
-    account_type = session_state.get("current_account", "Fast/Acc")
-    active_trades = active_trades_store[account_type]
+async def reset_account(ctx: AccountCtx = Depends(get_account_ctx)):
+    account_type = ctx.account_type
+    active_trades = ctx.trades
     
     # Reset to default balance
     new_balance = DEFAULT_ACCOUNT_BALANCE
     
     account_metrics_store[account_type] = AccountMetrics(balance=new_balance, equity=new_balance, free_margin=new_balance)
+    for trade_id in active_trades:
+        trade_index.pop(trade_id, None)
     active_trades.clear()
+    for symbol_trades in active_trades_by_symbol[account_type].values():
+        symbol_trades.clear()
+    active_trade_arrays[account_type].clear()
+    trade_totals_cache[account_type] = None
     
-    SessionLocal = account_session_makers[account_type]
+    SessionLocal = ctx.session_maker
     with SessionLocal() as db:
-        db.query(TradeDataDB).delete()
+        # Plain table-wide DELETE: nothing to reconcile with the session's identity map
+        db.execute(delete(TradeDataDB).execution_options(synchronize_session=False))
         db.commit()
     
-    await manager.broadcast(json.dumps({"type": "account_reset", "account_type": account_type, "message": f"{account_type} account reset", "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")}))
-    print(f"{account_type} account reset")
+    await manager.broadcast_json({"type": "account_reset", "account_type": account_type, "message": f"{account_type} account reset", "timestamp": format_timestamp()})
+    logger.info("%s account reset", account_type)
     return {"status": "success", "account_type": account_type, "message": f"{account_type} account reset", "new_balance": new_balance}
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str, token: str = None):
     await websocket.accept()
-    
-    user_role = UserRole.USER
-    is_admin = False
-    username = None
-    
     await manager.connect(websocket)
     
-    await websocket.send_text(json.dumps({"type": "connection_established", "client_id": client_id, "role": user_role, "is_admin": is_admin, "current_account": session_state.get("current_account", "Fast/Acc"), "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")}))
+    await websocket.send_text(CONNECTION_ESTABLISHED_TEMPLATE % (encode_json(client_id), encode_json(session_state.get("current_account", "Fast/Acc")), encode_json(format_timestamp())))
     
     try:
         while True:
             data = await websocket.receive_text()
+            # Heartbeats are answered without parsing; anything else goes through the JSON path
+            if data == PING_FRAME:
+                await websocket.send_text(PONG_FRAME)
+                continue
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    await websocket.send_text(PONG_FRAME)
             except json.JSONDecodeError:
                 pass
     except WebSocketDisconnect:
@@ -1969,15 +2361,15 @@ async def upload_profile_image(category: ImageCategory, file: UploadFile = File(
         db.commit()
     
     # Broadcast to all connected users
-    await manager.broadcast(json.dumps({
+    await manager.broadcast_json({
         "type": "profile_image_updated",
         "category": category.value,
         "image_id": image_id,
         "action": action,
-        "timestamp": current_time.strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-    }))
+        "timestamp": format_timestamp(current_time)
+    })
     
-    print(f"Profile image {action} for category '{category.value}': {image_id}")
+    logger.info("Profile image %s for category '%s': %s", action, category.value, image_id)
     
     return {
         "status": "success",
@@ -1988,7 +2380,7 @@ async def upload_profile_image(category: ImageCategory, file: UploadFile = File(
     }
 
 @app.get("/api/profile/image/{category}")
-async def get_profile_image(category: ImageCategory):
+def get_profile_image(category: ImageCategory):
     """
     Get the current image for a specific category.
     """
@@ -2009,11 +2401,11 @@ async def get_profile_image(category: ImageCategory):
             "image_id": image.id,
             "content_type": image.content_type,
             "image_data": f"data:{image.content_type};base64,{image_base64}",
-            "uploaded_at": image.uploaded_at.strftime("%Y-%m-%d %H:%M:%S")
+            "uploaded_at": image.uploaded_at.strftime(DATETIME_FORMAT)
         }
 
 @app.get("/api/profile/images/all")
-async def get_all_profile_images():
+def get_all_profile_images():
     """
     Get all profile images for all categories.
     """
@@ -2027,7 +2419,7 @@ async def get_all_profile_images():
                 "image_id": image.id,
                 "content_type": image.content_type,
                 "image_data": f"data:{image.content_type};base64,{image_base64}",
-                "uploaded_at": image.uploaded_at.strftime("%Y-%m-%d %H:%M:%S")
+                "uploaded_at": image.uploaded_at.strftime(DATETIME_FORMAT)
             }
         
         return {
@@ -2054,14 +2446,14 @@ async def delete_profile_image(category: ImageCategory):
         db.commit()
     
     # Broadcast deletion to all connected users
-    await manager.broadcast(json.dumps({
+    await manager.broadcast_json({
         "type": "profile_image_deleted",
         "category": category.value,
         "image_id": image_id,
-        "timestamp": get_current_time_in_timezone().strftime(f"%Y-%m-%d %H:%M:%S {SYSTEM_TIMEZONE}")
-    }))
+        "timestamp": format_timestamp()
+    })
     
-    print(f"Profile image deleted for category '{category.value}': {image_id}")
+    logger.info("Profile image deleted for category '%s': %s", category.value, image_id)
     
     return {
         "status": "success",
@@ -2072,12 +2464,6 @@ async def delete_profile_image(category: ImageCategory):
 
 if __name__ == "__main__":
     import uvicorn
-    import subprocess
-    import sys
-    import webbrowser
-    import os
-    import time
-    from threading import Timer
     
     print("\n" + "="*60)
     print("METATRADER 5 SIMULATOR - MULTI-ACCOUNT EDITION")
@@ -2092,22 +2478,8 @@ if __name__ == "__main__":
     print("\nAvailable Accounts: Fast/Acc, Demo/Acc, Hunter/Acc, LivePro/Acc")
     print("="*60 + "\n")
     
-    # Function to open the HTML dashboard after server starts (only for local development)
-    def open_dashboard():
-        # Skip opening browser on Render (production)
-        if os.getenv('RENDER'):
-            return
-        time.sleep(2)  # Wait for server to fully start
-        html_file = os.path.join(os.path.dirname(__file__), "frontend.html")
-        if os.path.exists(html_file):
-            print(f"Opening dashboard: {html_file}")
-            webbrowser.open(f"file:///{html_file}")
-        else:
-            print(f"WARNING: Dashboard file not found: {html_file}")
-    
-    # Start timer to open HTML dashboard (only for local development)
-    if not os.getenv('RENDER'):
-        Timer(0.5, open_dashboard).start()
+    # Open the HTML dashboard once the server has started (only for local development, not on Render)
+    OPEN_DASHBOARD_ON_STARTUP = not os.getenv('RENDER')
     
     try:
         # Get port from environment variable for production (Render), default to 8080 for local development
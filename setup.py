@@ -10,7 +10,7 @@ setup(
         'python-jose[cryptography]>=3.3.0',
         'python-multipart>=0.0.5',
         'sqlalchemy>=1.4.0',
-        'pydantic>=1.8.0',
+        'pydantic>=2.4.0',
         'python-dotenv>=0.19.0',
         'websockets>=10.0',
         'aiofiles>=0.7.0',
@@ -18,6 +18,7 @@ setup(
         'cryptography>=35.0.0',
         'pytz>=2021.3',
         'numpy>=1.21.0',
+        'orjson>=3.6.0',
     ],
     python_requires='>=3.9',
 )